@@ -0,0 +1,73 @@
+"""Асинхронные версии горячих эндпоинтов для запуска под ASGI.
+
+В Django 3.2 нет асинхронного ORM, а синхронные представления под ASGI
+выполняются по очереди в одном общем потоке. Здесь чтения (GET, HEAD,
+OPTIONS) целиком, вместе с запросами к базе и рендерингом, уходят в пул
+потоков одним переходом sync_to_async(thread_sensitive=False). Так
+запросы одного воркера обрабатываются параллельно, а медленный клиент
+занимает только цикл событий. Записи с их транзакциями остаются в общем
+потоке, как у обычных синхронных представлений.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+ASYNC_ROUTES = (
+    'recipes-list',
+    'recipes-detail',
+    'tags-list',
+    'tags-detail',
+    'ingredients-list',
+    'ingredients-detail',
+)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_VIEW_THREADS,
+    thread_name_prefix='async-view',
+)
+
+
+def offload(view):
+    def run(request, *args, **kwargs):
+        # Соединения потоков пула живут дольше запроса, поэтому
+        # закрываются здесь, как это делает обработчик request_finished.
+        close_old_connections()
+        try:
+            response = view(request, *args, **kwargs)
+            if callable(getattr(response, 'render', None)):
+                response.render()
+            return response
+        finally:
+            close_old_connections()
+
+    run_in_pool = sync_to_async(run, thread_sensitive=False, executor=executor)
+    run_thread_sensitive = sync_to_async(view, thread_sensitive=True)
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await run_in_pool(request, *args, **kwargs)
+        return await run_thread_sensitive(request, *args, **kwargs)
+
+    return async_view
+
+
+def offload_routes(patterns, names=ASYNC_ROUTES):
+    """Заменяет представления маршрутов с именами из `names` на асинхронные."""
+    return [
+        URLPattern(
+            pattern.pattern,
+            offload(pattern.callback),
+            pattern.default_args,
+            pattern.name,
+        )
+        if pattern.name in names
+        else pattern
+        for pattern in patterns
+    ]
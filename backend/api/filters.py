@@ -1,38 +1,126 @@
+from django.conf import settings
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.search import ingredient_index, search_recipes
+from users.search import search_users
 
 
 class RecipeFilter(FilterSet):
+    """Фильтры по связанным таблицам сделаны через EXISTS.
+
+    JOIN по тегам размножал рецепты с несколькими выбранными тегами,
+    а подзапросы не меняют число строк и опираются на индексы
+    (recipe, tag), (tag, recipe) и уникальные (user, recipe).
+    """
+
+    TAGS_ANY = 'any'
+    TAGS_ALL = 'all'
+
     tags = filters.ModelMultipleChoiceFilter(
         field_name='tags__slug',
         to_field_name='slug',
         queryset=Tag.objects.all(),
+        method='filter_tags',
+    )
+    tags_mode = filters.ChoiceFilter(
+        choices=(
+            (TAGS_ANY, 'любой из тегов'),
+            (TAGS_ALL, 'все теги'),
+        ),
+        method='filter_tags_mode',
     )
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart',
     )
 
-    def filter_is_favorited(self, queryset, name, value):
-        if value:
-            return queryset.filter(favorite__user=self.request.user)
+    @staticmethod
+    def recipe_tags(tags):
+        return Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'),
+            tag__in=tags,
+        )
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        if self.form.cleaned_data.get('tags_mode') != self.TAGS_ALL:
+            return queryset.filter(Exists(self.recipe_tags(value)))
+        for tag in value:
+            queryset = queryset.filter(Exists(self.recipe_tags([tag])))
         return queryset
 
-    def filter_is_in_shopping_cart(self, queryset, name, value):
-        if value and self.request.user.is_authenticated:
-            return queryset.filter(shopping_cart__user=self.request.user)
+    def filter_tags_mode(self, queryset, name, value):
         return queryset
 
+    def filter_user_relation(self, queryset, model, value):
+        if not value or not self.request.user.is_authenticated:
+            return queryset
+        return queryset.filter(
+            Exists(
+                model.objects.filter(
+                    recipe=OuterRef('pk'),
+                    user=self.request.user,
+                ),
+            ),
+        )
+
+    def filter_is_favorited(self, queryset, name, value):
+        return self.filter_user_relation(queryset, Favorite, value)
+
+    def filter_is_in_shopping_cart(self, queryset, name, value):
+        return self.filter_user_relation(queryset, ShoppingCart, value)
+
     class Meta:
         model = Recipe
-        fields = ('is_favorited', 'author', 'is_in_shopping_cart', 'tags')
+        fields = (
+            'is_favorited',
+            'author',
+            'is_in_shopping_cart',
+            'tags',
+            'tags_mode',
+        )
 
 
 class IngredientFilter(SearchFilter):
     search_param = 'name'
 
+    def filter_queryset(self, request, queryset, view):
+        query = ' '.join(self.get_search_terms(request))
+        if not query or view.action != 'list':
+            return super().filter_queryset(request, queryset, view)
+        return ingredient_index.search(
+            query,
+            limit=settings.INGREDIENT_SEARCH_LIMIT,
+        )
+
     class Meta:
         model = Ingredient
         fields = ('name',)
+
+
+class RecipeSearchFilter(SearchFilter):
+    """Полнотекстовый поиск `?search=` с сортировкой по релевантности.
+
+    Подключается последним: порядок по рангу заменяет сортировку по
+    умолчанию. Курсорная пагинация сортирует по дате в любом случае.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = ' '.join(self.get_search_terms(request))
+        if not query:
+            return queryset
+        return search_recipes(queryset, query)
+
+
+class UserSearchFilter(SearchFilter):
+    """`?search=`: вхождения в username и e-mail, затем опечатки."""
+
+    def filter_queryset(self, request, queryset, view):
+        query = ' '.join(self.get_search_terms(request))
+        if not query or '@' in query:
+            return super().filter_queryset(request, queryset, view)
+        return search_users(queryset, query)
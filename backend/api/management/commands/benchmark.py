@@ -0,0 +1,302 @@
+import base64
+import io
+import json
+import math
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.cart import rebuild_cart_totals
+from recipes.feed import rebuild_feeds
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Follow, User
+
+SEED_USERS = 20
+SEED_RECIPES = 200
+SEED_INGREDIENTS = 100
+RECIPE_INGREDIENTS = 5
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def png_data_uri():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'white').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue(),
+    ).decode()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку, число запросов и память основных эндпоинтов. '
+        'Все изменения в базе откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--memory-iterations',
+            type=int,
+            default=5,
+            help='Сколько запросов замерять с tracemalloc',
+        )
+        parser.add_argument(
+            '--output',
+            help='Путь к JSON-файлу с результатами',
+        )
+
+    @staticmethod
+    def seed():
+        """Небольшой набор данных, если база пуста."""
+        User.objects.bulk_create(
+            User(
+                email=f'benchmark{number}@example.com',
+                username=f'benchmark{number}',
+                first_name='Benchmark',
+                last_name=str(number),
+            )
+            for number in range(SEED_USERS)
+        )
+        users = list(User.objects.filter(username__startswith='benchmark'))
+        tags = [
+            Tag.objects.get_or_create(slug=name, defaults={'name': name})[0]
+            for name in ('breakfast', 'lunch', 'dinner')
+        ]
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+                for number in range(SEED_INGREDIENTS)
+            ),
+            ignore_conflicts=True,
+        )
+        ingredients = list(Ingredient.objects.all()[:SEED_INGREDIENTS])
+        for number in range(SEED_RECIPES):
+            recipe = Recipe.objects.create(
+                author=users[number % len(users)],
+                name=f'рецепт {number}',
+                text='текст рецепта',
+                cooking_time=number % 60 + 1,
+            )
+            recipe.tags.set(tags[: number % len(tags) + 1])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=ingredients[
+                        (number + offset) % len(ingredients)
+                    ],
+                    amount=offset + 1,
+                )
+                for offset in range(RECIPE_INGREDIENTS)
+            )
+        reader = users[0]
+        recipes = list(Recipe.objects.all()[:SEED_RECIPES // 4])
+        Follow.objects.bulk_create(
+            Follow(user=reader, following=author) for author in users[1:]
+        )
+        Favorite.objects.bulk_create(
+            Favorite(user=reader, recipe=recipe) for recipe in recipes
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=reader, recipe=recipe) for recipe in recipes
+        )
+        rebuild_cart_totals([reader])
+        rebuild_feeds([reader])
+
+    @staticmethod
+    def pick_user():
+        return (
+            User.objects.filter(shopping_cart__isnull=False)
+            .order_by('id')
+            .first()
+            or User.objects.order_by('id').first()
+        )
+
+    @staticmethod
+    def endpoints(recipe, tag, ingredients):
+        recipe_data = {
+            'name': 'benchmark',
+            'text': 'benchmark',
+            'cooking_time': 10,
+            'image': png_data_uri(),
+            'tags': [tag.id],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 10}
+                for ingredient in ingredients
+            ],
+        }
+        return (
+            ('recipe_list', 'get', '/api/recipes/?limit=6', None),
+            (
+                'recipe_list_filtered',
+                'get',
+                f'/api/recipes/?limit=6&tags={tag.slug}'
+                '&is_favorited=1&is_in_shopping_cart=1',
+                None,
+            ),
+            ('recipe_detail', 'get', f'/api/recipes/{recipe.id}/', None),
+            (
+                'recipe_search',
+                'get',
+                '/api/recipes/?'
+                + urlencode({'limit': 6, 'search': recipe.name}),
+                None,
+            ),
+            ('feed', 'get', '/api/recipes/feed/?limit=6', None),
+            (
+                'recipe_similar',
+                'get',
+                f'/api/recipes/{recipe.id}/similar/',
+                None,
+            ),
+            (
+                'subscriptions',
+                'get',
+                '/api/users/subscriptions/?limit=6&recipes_limit=3',
+                None,
+            ),
+            ('ingredient_search', 'get', '/api/ingredients/?name=ин', None),
+            (
+                'ingredient_fuzzy_search',
+                'get',
+                '/api/ingredients/?' + urlencode({'name': 'карофель'}),
+                None,
+            ),
+            (
+                'shopping_cart_totals',
+                'get',
+                '/api/recipes/shopping_cart/ingredients/',
+                None,
+            ),
+            (
+                'shopping_list',
+                'get',
+                '/api/recipes/download_shopping_cart/',
+                None,
+            ),
+            ('recipe_create', 'post', '/api/recipes/', recipe_data),
+            (
+                'recipe_update',
+                'patch',
+                f'/api/recipes/{recipe.id}/',
+                recipe_data,
+            ),
+        )
+
+    @staticmethod
+    def request(client, method, url, data):
+        response = getattr(client, method)(url, data, format='json')
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def measure(self, client, endpoint, options):
+        _, method, url, data = endpoint
+        for _ in range(options['warmup']):
+            self.request(client, method, url, data)
+        latencies = []
+        queries = []
+        for _ in range(options['iterations']):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = self.request(client, method, url, data)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+        peaks = []
+        for _ in range(options['memory_iterations']):
+            tracemalloc.start()
+            self.request(client, method, url, data)
+            peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+            tracemalloc.stop()
+        return {
+            'status': response.status_code,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'mean_ms': round(sum(latencies) / len(latencies), 2),
+            'queries': max(queries),
+            'peak_kb': round(max(peaks), 1) if peaks else None,
+        }
+
+    def run_endpoints(self, options):
+        results = {}
+        with transaction.atomic():
+            if not Recipe.objects.exists():
+                self.seed()
+            user = self.pick_user()
+            recipe = Recipe.objects.filter(author=user).first()
+            if recipe is None:
+                recipe = Recipe.objects.create(
+                    author=user,
+                    name='benchmark',
+                    text='benchmark',
+                    cooking_time=1,
+                )
+            client = APIClient()
+            client.force_authenticate(user)
+            endpoints = self.endpoints(
+                recipe,
+                Tag.objects.first(),
+                Ingredient.objects.all()[:RECIPE_INGREDIENTS],
+            )
+            for endpoint in endpoints:
+                results[endpoint[0]] = self.measure(client, endpoint, options)
+                self.stdout.write(
+                    '{:<22} {status} p50={p50_ms}ms p95={p95_ms}ms '
+                    'queries={queries} peak={peak_kb}KB'.format(
+                        endpoint[0],
+                        **results[endpoint[0]],
+                    ),
+                )
+            transaction.set_rollback(True)
+        return results
+
+    def handle(self, *args, **options):
+        # Откат транзакции не удаляет загруженные изображения.
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                results = self.run_endpoints(options)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+        if options['output']:
+            report = {
+                'commit': git_commit(),
+                'database': connection.vendor,
+                'iterations': options['iterations'],
+                'results': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
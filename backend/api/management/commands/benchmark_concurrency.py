@@ -0,0 +1,197 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from api.management.commands.benchmark import git_commit, percentile
+
+SERVER_START_TIMEOUT = 30
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность одного воркера gunicorn в '
+        'режимах wsgi и asgi, пока медленные клиенты держат соединения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modes',
+            nargs='+',
+            default=['wsgi', 'asgi'],
+            choices=['wsgi', 'asgi'],
+        )
+        parser.add_argument('--url', default='/api/recipes/?limit=6')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument(
+            '--slow-clients',
+            type=int,
+            default=20,
+            help='Клиенты, отправляющие заголовки по одному',
+        )
+        parser.add_argument(
+            '--slow-headers',
+            type=int,
+            default=5,
+            help='Сколько заголовков отправляет медленный клиент',
+        )
+        parser.add_argument(
+            '--slow-interval',
+            type=float,
+            default=0.5,
+            help='Пауза между заголовками медленного клиента, с',
+        )
+        parser.add_argument(
+            '--probe-clients',
+            type=int,
+            default=4,
+            help='Обычные клиенты, чью задержку замеряем',
+        )
+        parser.add_argument(
+            '--output',
+            help='Путь к JSON-файлу с результатами',
+        )
+
+    @staticmethod
+    def request_lines(url, headers):
+        yield f'GET {url} HTTP/1.1\r\nHost: localhost\r\n'
+        for number in range(headers):
+            yield f'X-Slow-{number}: 1\r\n'
+        yield 'Connection: close\r\n\r\n'
+
+    async def fetch(self, port, url, headers=0, interval=0):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            for line in self.request_lines(url, headers):
+                writer.write(line.encode())
+                await writer.drain()
+                if interval:
+                    await asyncio.sleep(interval)
+            status = (await reader.readline()).split(b' ')[1]
+            await reader.read()
+            return int(status)
+        finally:
+            writer.close()
+
+    async def client(self, deadline, results, fetch):
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(
+                    fetch(),
+                    timeout=deadline - time.monotonic(),
+                )
+            except asyncio.TimeoutError:
+                return
+            except (OSError, IndexError, ValueError):
+                results['errors'] += 1
+                continue
+            if status >= 400:
+                results['errors'] += 1
+            results['latencies'].append(
+                (time.perf_counter() - started) * 1000,
+            )
+
+    async def load(self, options):
+        deadline = time.monotonic() + options['duration']
+        port = options['port']
+        url = options['url']
+        probes = {'latencies': [], 'errors': 0}
+        slow = {'latencies': [], 'errors': 0}
+        await asyncio.gather(
+            *(
+                self.client(
+                    deadline,
+                    slow,
+                    lambda: self.fetch(
+                        port,
+                        url,
+                        options['slow_headers'],
+                        options['slow_interval'],
+                    ),
+                )
+                for _ in range(options['slow_clients'])
+            ),
+            *(
+                self.client(deadline, probes, lambda: self.fetch(port, url))
+                for _ in range(options['probe_clients'])
+            ),
+        )
+        latencies = probes['latencies']
+        return {
+            'probe_requests': len(latencies),
+            'probe_rps': round(len(latencies) / options['duration'], 1),
+            'probe_p50_ms': (
+                round(percentile(latencies, 50), 1) if latencies else None
+            ),
+            'probe_p95_ms': (
+                round(percentile(latencies, 95), 1) if latencies else None
+            ),
+            'slow_requests': len(slow['latencies']),
+            'errors': probes['errors'] + slow['errors'],
+        }
+
+    @staticmethod
+    def wait_for_port(port, server):
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('gunicorn завершился при запуске')
+            try:
+                socket.create_connection(('127.0.0.1', port), 1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError('gunicorn не запустился')
+
+    def run_mode(self, mode, options):
+        env = dict(
+            os.environ,
+            SERVER_MODE=mode,
+            GUNICORN_BIND=f'127.0.0.1:{options["port"]}',
+            GUNICORN_WORKERS=str(options['workers']),
+        )
+        server = subprocess.Popen(
+            (sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'),
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            self.wait_for_port(options['port'], server)
+            return asyncio.run(self.load(options))
+        finally:
+            server.terminate()
+            server.wait()
+
+    def handle(self, *args, **options):
+        results = {}
+        for mode in options['modes']:
+            results[mode] = self.run_mode(mode, options)
+            self.stdout.write(
+                '{:<5} probes={probe_requests} rps={probe_rps} '
+                'p50={probe_p50_ms}ms p95={probe_p95_ms}ms '
+                'slow={slow_requests} errors={errors}'.format(
+                    mode,
+                    **results[mode],
+                ),
+            )
+        if options['output']:
+            report = {
+                'commit': git_commit(),
+                'url': options['url'],
+                'workers': options['workers'],
+                'slow_clients': options['slow_clients'],
+                'results': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
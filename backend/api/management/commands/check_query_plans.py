@@ -0,0 +1,154 @@
+import re
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.management.commands.benchmark import RECIPE_INGREDIENTS
+from api.management.commands.benchmark import Command as Benchmark
+from recipes.models import Ingredient, Recipe, Tag
+
+MIN_ROWS = 10000
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?:(?!USING).)*$')
+SQL_ALIAS = re.compile(r'"(\w+)" (?:AS )?([A-Z]\d+)\b')
+# COUNT(*) страничной пагинации по всей таблице без условий (см.
+# api.pagination.CountPaginator): такой запрос по определению читает все
+# строки, и PostgreSQL выбирает для него Seq Scan. Это цена номеров
+# страниц, курсорная пагинация его не делает. Подсчёты с фильтрами
+# проверяются как обычно.
+PAGINATION_COUNT = re.compile(
+    r'^SELECT COUNT\(\*\) FROM \(SELECT "\w+"\."id" AS Col1 '
+    r'FROM "\w+"\) subquery$',
+)
+
+
+def pg_seq_scans(plan):
+    """Таблицы, которые план PostgreSQL читает последовательно."""
+    if plan.get('Node Type') == 'Seq Scan':
+        yield plan['Relation Name']
+    for child in plan.get('Plans', ()):
+        yield from pg_seq_scans(child)
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет EXPLAIN для запросов основных эндпоинтов и завершается '
+        'с ошибкой, если большая таблица читается полным сканированием. '
+        'Запускать на базе, заполненной generate_dataset.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=MIN_ROWS,
+            help='С какого числа строк таблица считается большой',
+        )
+        parser.add_argument(
+            '--skip',
+            action='append',
+            default=[],
+            help='Не проверять эндпоинт с таким именем',
+        )
+
+    @staticmethod
+    def endpoints(recipe, tag, ingredients):
+        endpoints = [
+            (name, url)
+            for name, method, url, _ in Benchmark.endpoints(
+                recipe,
+                tag,
+                ingredients,
+            )
+            if method == 'get'
+        ]
+        endpoints.append(
+            ('recipe_list_cursor', '/api/recipes/?pagination=cursor&limit=6'),
+        )
+        return endpoints
+
+    @staticmethod
+    def table_sizes():
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('ANALYZE')
+                cursor.execute(
+                    'SELECT relname, reltuples FROM pg_class '
+                    "WHERE relkind = 'r'",
+                )
+                return dict(cursor.fetchall())
+            return {
+                table: cursor.execute(
+                    f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}',
+                ).fetchone()[0]
+                for table in connection.introspection.table_names(cursor)
+            }
+
+    @staticmethod
+    def seq_scans(sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                return set(pg_seq_scans(cursor.fetchone()[0][0]['Plan']))
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            aliases = {alias: table for table, alias in SQL_ALIAS.findall(sql)}
+            return {
+                aliases.get(match.group(1), match.group(1))
+                for match in (
+                    SQLITE_SCAN.match(row[-1]) for row in cursor.fetchall()
+                )
+                if match
+            }
+
+    def captured_selects(self, client, url):
+        # Первый запрос прогревает кеши процесса: индекс ингредиентов
+        # строится полным чтением таблицы, и это ожидаемо.
+        Benchmark.request(client, 'get', url, None)
+        with CaptureQueriesContext(connection) as context:
+            response = Benchmark.request(client, 'get', url, None)
+        if response.status_code >= 400:
+            raise CommandError(f'{url}: статус {response.status_code}')
+        return {
+            query['sql']
+            for query in context.captured_queries
+            if query['sql'].lstrip().upper().startswith('SELECT')
+            and not PAGINATION_COUNT.match(query['sql'].strip())
+        }
+
+    def handle(self, *args, **options):
+        problems = []
+        with transaction.atomic():
+            if not Recipe.objects.exists():
+                Benchmark.seed()
+            sizes = self.table_sizes()
+            user = Benchmark.pick_user()
+            client = APIClient()
+            client.force_authenticate(user)
+            endpoints = self.endpoints(
+                Recipe.objects.first(),
+                Tag.objects.first(),
+                Ingredient.objects.all()[:RECIPE_INGREDIENTS],
+            )
+            for name, url in endpoints:
+                if name in options['skip']:
+                    continue
+                for sql in self.captured_selects(client, url):
+                    large = [
+                        table
+                        for table in sorted(self.seq_scans(sql))
+                        if sizes.get(table, 0) >= options['min_rows']
+                    ]
+                    if large:
+                        problems.append((name, large, sql))
+                self.stdout.write(f'{name}: проверено')
+            transaction.set_rollback(True)
+        for name, tables, sql in problems:
+            self.stderr.write(
+                f'{name}: полное сканирование {", ".join(tables)}\n{sql}\n',
+            )
+        if problems:
+            raise CommandError(
+                f'Найдено планов с полным сканированием: {len(problems)}',
+            )
+        self.stdout.write(self.style.SUCCESS('Планы запросов в порядке'))
@@ -0,0 +1,76 @@
+import hashlib
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework.response import Response
+
+from core.cache import get_reference_version
+
+
+def reference_version(request):
+    """Версия справочников, прочитанная один раз за запрос."""
+    if not hasattr(request, '_reference_version'):
+        request._reference_version = get_reference_version()
+    return request._reference_version
+
+
+def reference_etag(request, *args, **kwargs):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'{reference_version(request)}-{path}'
+
+
+def reference_last_modified(request, *args, **kwargs):
+    return datetime.fromtimestamp(
+        reference_version(request) / 10**9,
+        tz=timezone.utc,
+    )
+
+
+reference_condition = method_decorator(
+    condition(
+        etag_func=reference_etag,
+        last_modified_func=reference_last_modified,
+    ),
+)
+
+
+class ReferenceCacheMixin:
+    """Кеширует ответы list/retrieve справочных данных.
+
+    Ключ кеша содержит версию справочников, которую сбрасывают сигналы
+    моделей и команды загрузки, поэтому устаревшие записи не читаются.
+    На If-None-Match и If-Modified-Since отвечает 304, прочитав только
+    версию из кеша.
+    """
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = (
+            f'reference:{reference_version(request)}:'
+            f'{request.get_full_path()}'
+        )
+        data = cache.get(key)
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            data = response.data
+            cache.set(key, data)
+        response = Response(data)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    @reference_condition
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    @reference_condition
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve,
+            request,
+            *args,
+            **kwargs,
+        )
@@ -0,0 +1,13 @@
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class FirstRendererNegotiation(DefaultContentNegotiation):
+    """Всегда выбирает первый рендерер представления.
+
+    Нужен действиям, у которых параметр `format` означает формат
+    выгружаемого файла, а не рендерер DRF: ответы с ошибками при этом
+    отдаются рендерером по умолчанию.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
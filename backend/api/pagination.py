@@ -1,6 +1,90 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    PageNumberPagination,
+)
+from rest_framework.response import Response
+
+
+class CountPaginator(Paginator):
+    """Считает строки без аннотаций списка: на число они не влияют,
+    а EXISTS для каждой строки сделали бы COUNT заметно дороже.
+    """
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'values'):
+            return self.object_list.values('pk').count()
+        return super().count
 
 
 class LimitPagePagination(PageNumberPagination):
+    django_paginator_class = CountPaginator
+    page_size = 6
+    page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Пагинация по ключу (pub_date, id) без COUNT и OFFSET."""
+
     page_size = 6
     page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
+
+
+class FeedPagination(CursorPagination):
+    """Пагинация ленты по ключу (pub_date, id рецепта).
+
+    Позиция курсора - ключ целиком, поэтому смещение для одинаковых дат
+    не нужно. Страницы выбирает recipes.feed.feed_keys, назад лента
+    не листается.
+    """
+
+    page_size = 6
+    page_size_query_param = 'limit'
+
+    def decode_key(self, request):
+        """Ключ, после которого начинается страница, или None."""
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            return None
+        try:
+            pub_date, pk = cursor.position.rsplit(' ', 1)
+            return datetime.fromisoformat(pub_date), int(pk)
+        except (AttributeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_keys(self, keys, limit, request):
+        """Ключи страницы из выбранных с запасом в один."""
+        self.base_url = request.build_absolute_uri()
+        self.next_key = keys[limit - 1] if len(keys) > limit else None
+        return keys[:limit]
+
+    def get_next_link(self):
+        if self.next_key is None:
+            return None
+        pub_date, pk = self.next_key
+        return self.encode_cursor(
+            Cursor(
+                offset=0,
+                reverse=False,
+                position=f'{pub_date.isoformat()} {pk}',
+            ),
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ('next', self.get_next_link()),
+                    ('previous', None),
+                    ('results', data),
+                ],
+            ),
+        )
@@ -1,16 +1,23 @@
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers, status
 from rest_framework.relations import PrimaryKeyRelatedField
 from rest_framework.serializers import ModelSerializer, SlugRelatedField
 from rest_framework.validators import UniqueTogetherValidator
 
-from core.utils import Base64ImageField
+from core.utils import Base64ImageField, get_following_ids
+from recipes.cart import changing_recipe_ingredients
 from recipes.models import (
     Favorite,
     Ingredient,
     Recipe,
     RecipeIngredient,
     ShoppingCart,
+    ShoppingCartIngredient,
     Tag,
 )
 from users.models import Follow, User
@@ -31,13 +38,12 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
-        if request.user.is_anonymous:
+        if request is None or request.user.is_anonymous:
             return False
-        return Follow.objects.filter(
-            user=request.user,
-            following=obj.pk,
-        ).exists()
+        return obj.pk in get_following_ids(request)
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
@@ -85,7 +91,7 @@ class RecipeIngredientsSerializer(ModelSerializer):
 
 
 class IngredientsAmountSerializer(ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
 
     class Meta:
         model = RecipeIngredient
@@ -110,7 +116,6 @@ class RecipeInfoSerializer(serializers.ModelSerializer):
 
 class FollowSerializer(CustomUserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta(CustomUserSerializer.Meta):
         fields = CustomUserSerializer.Meta.fields + (
@@ -128,14 +133,11 @@ class FollowSerializer(CustomUserSerializer):
         request = self.context.get('request')
         limit = request.query_params.get('recipes_limit')
         recipes = obj.recipes.all()
-        if limit:
+        if limit and limit.isdigit():
             recipes = recipes[: int(limit)]
         serializer = RecipeInfoSerializer(recipes, many=True, read_only=True)
         return serializer.data
 
-    def get_recipes_count(self, author):
-        return Recipe.objects.filter(author=author).count()
-
     def validate(self, data):
         following = self.instance
         user = self.context.get('request').user
@@ -164,6 +166,8 @@ class RecipeSerializer(ModelSerializer):
     image = Base64ImageField(max_length=None)
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         return (
             request
@@ -172,6 +176,8 @@ class RecipeSerializer(ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
@@ -182,14 +188,13 @@ class RecipeSerializer(ModelSerializer):
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        exclude = ('search_vector', 'similar_updated')
 
 
 class RecipePostSerializer(ModelSerializer):
     author = CustomUserSerializer(read_only=True)
-    tags = PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True,
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
         allow_empty=False,
     )
     ingredients = IngredientsAmountSerializer(many=True)
@@ -201,30 +206,45 @@ class RecipePostSerializer(ModelSerializer):
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        exclude = ('search_vector', 'similar_updated')
         read_only_fields = ('author',)
 
+    @staticmethod
+    def get_objects(model, ids, message):
+        """Все объекты по id одним запросом, в порядке запроса."""
+        objects = model.objects.in_bulk(ids)
+        missing = [pk for pk in ids if pk not in objects]
+        if missing:
+            raise serializers.ValidationError(
+                message.format(', '.join(map(str, missing))),
+            )
+        return [objects[pk] for pk in ids]
+
     def validate_ingredients(self, ingredients):
-        ingredients_list = []
         if not ingredients:
             raise serializers.ValidationError('Не выбраны ингредиенты')
-        for ingredient in ingredients:
-            if ingredient['id'] in ingredients_list:
-                raise serializers.ValidationError(
-                    'Ингредиенты должны быть уникальными',
-                )
-            ingredients_list.append(ingredient['id'])
+        ids = [ingredient['id'] for ingredient in ingredients]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError(
+                'Ингредиенты должны быть уникальными',
+            )
+        objects = self.get_objects(
+            Ingredient,
+            ids,
+            'Указанных ингредиентов не существует: {}',
+        )
+        for ingredient, obj in zip(ingredients, objects):
+            ingredient['id'] = obj
         return ingredients
 
     def validate_tags(self, tags):
         if not tags:
             raise serializers.ValidationError('Не выбраны теги для рецепта')
-        for tag in tags:
-            if not Tag.objects.filter(id=tag.id).exists():
-                raise serializers.ValidationError(
-                    'Указанного тега не существует',
-                )
-        return tags
+        return self.get_objects(
+            Tag,
+            list(dict.fromkeys(tags)),
+            'Указанного тега не существует: {}',
+        )
 
     def validate_cooking_time(self, cooking_time):
         if cooking_time < 1:
@@ -233,27 +253,57 @@ class RecipePostSerializer(ModelSerializer):
             )
         return cooking_time
 
+    @staticmethod
+    def set_ingredients(instance, ingredient_list, created):
+        """Пишет в базу только разницу с текущим составом рецепта."""
+        amounts = {
+            item['id'].pk: item['amount'] for item in ingredient_list
+        }
+        current = {}
+        if not created:
+            current = {
+                row.ingredient_id: row
+                for row in RecipeIngredient.objects.filter(recipe=instance)
+            }
+        removed = [
+            row.pk for pk, row in current.items() if pk not in amounts
+        ]
+        changed = []
+        for pk, row in current.items():
+            if pk in amounts and row.amount != amounts[pk]:
+                row.amount = amounts[pk]
+                changed.append(row)
+        added = [
+            RecipeIngredient(recipe=instance, ingredient_id=pk, amount=amount)
+            for pk, amount in amounts.items()
+            if pk not in current
+        ]
+        if not (removed or changed or added):
+            return
+        with (
+            nullcontext() if created
+            else changing_recipe_ingredients([instance])
+        ):
+            RecipeIngredient.objects.filter(pk__in=removed).delete()
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+            RecipeIngredient.objects.bulk_create(added)
+
+    @transaction.atomic
     def update_create_recipe(self, validated_data, instance=None):
         tag_list = validated_data.pop('tags', None)
         ingredient_list = validated_data.pop('ingredients', None)
-        if not instance:
+        created = instance is None
+        if created:
             instance = super().create(validated_data)
         else:
             super().update(instance, validated_data)
-            instance.ingredients.clear()
-            instance.tags.clear()
-
-        RecipeIngredient.objects.bulk_create(
-            [
-                RecipeIngredient(
-                    recipe=instance,
-                    ingredient=ingredient_item['id'],
-                    amount=ingredient_item['amount'],
-                )
-                for ingredient_item in ingredient_list
-            ],
-        )
-        instance.tags.set(tag_list)
+        if ingredient_list is not None:
+            self.set_ingredients(instance, ingredient_list, created)
+        if tag_list is not None:
+            if created:
+                instance.tags.add(*tag_list)
+            else:
+                instance.tags.set(tag_list)
         return instance
 
     def create(self, validated_data):
@@ -263,12 +313,41 @@ class RecipePostSerializer(ModelSerializer):
         return self.update_create_recipe(validated_data, instance=instance)
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                RecipeIngredient.objects.select_related('ingredient'),
+            ),
+        )
         return RecipeSerializer(
             instance,
             context={'request': self.context.get('request')},
         ).data
 
 
+class ShoppingCartIngredientSerializer(ModelSerializer):
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit',
+    )
+    amount = serializers.ReadOnlyField(source='total_amount')
+
+    class Meta:
+        model = ShoppingCartIngredient
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RECIPES_LIMIT,
+    )
+
+
 class FavoriteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Favorite
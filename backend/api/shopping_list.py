@@ -0,0 +1,177 @@
+"""Потоковая выгрузка списка покупок в форматах txt, csv и pdf.
+
+Каждый рендерер принимает итератор строк агрегата `RecipeIngredient`
+(`ingredient__name`, `ingredient__measurement_unit`, `total_amount`)
+и возвращает генератор кусков ответа, не собирая файл целиком в памяти.
+"""
+import csv
+from itertools import chain
+
+from core.utils import batches
+
+TITLE = 'Список покупок:'
+CHUNK_SIZE = 100
+
+PDF_PAGE_WIDTH = 595
+PDF_PAGE_HEIGHT = 842
+PDF_MARGIN = 56
+PDF_FONT_SIZE = 12
+PDF_LEADING = 16
+PDF_LINES_PER_PAGE = (PDF_PAGE_HEIGHT - 2 * PDF_MARGIN) // PDF_LEADING
+PDF_ENCODING = 'cp1251'
+
+CYRILLIC_UPPER = 'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'
+CYRILLIC_LOWER = CYRILLIC_UPPER.lower()
+
+
+def ingredient_line(ingredient):
+    return (
+        f'{ingredient["ingredient__name"]} '
+        f'({ingredient["ingredient__measurement_unit"]}) - '
+        f'{ingredient["total_amount"]}'
+    )
+
+
+def render_txt(ingredients):
+    lines = chain([TITLE], map(ingredient_line, ingredients))
+    for batch in batches(lines, CHUNK_SIZE):
+        yield '\n'.join(batch) + '\n'
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+    for batch in batches(ingredients, CHUNK_SIZE):
+        yield ''.join(
+            writer.writerow(
+                (
+                    ingredient['ingredient__name'],
+                    ingredient['ingredient__measurement_unit'],
+                    ingredient['total_amount'],
+                ),
+            )
+            for ingredient in batch
+        )
+
+
+def glyph_name(char):
+    """Имя глифа Adobe (afii) для кириллической буквы."""
+    if char in CYRILLIC_UPPER:
+        return f'afii{10017 + CYRILLIC_UPPER.index(char)}'
+    return f'afii{10065 + CYRILLIC_LOWER.index(char)}'
+
+
+def pdf_font():
+    """Шрифт Helvetica с кодировкой cp1251 для кириллицы."""
+    differences = ' '.join(
+        f'{code} /{glyph_name(bytes([code]).decode(PDF_ENCODING))}'
+        for code in (0xA8, 0xB8, *range(0xC0, 0x100))
+    )
+    return (
+        '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+        '/Encoding << /Type /Encoding /BaseEncoding /WinAnsiEncoding '
+        f'/Differences [{differences}] >> >>'
+    ).encode()
+
+
+def pdf_string(text):
+    encoded = text.encode(PDF_ENCODING, errors='replace')
+    return b'(%s)' % (
+        encoded.replace(b'\\', b'\\\\')
+        .replace(b'(', b'\\(')
+        .replace(b')', b'\\)')
+    )
+
+
+def pdf_page_content(lines):
+    top = PDF_PAGE_HEIGHT - PDF_MARGIN
+    content = [
+        b'BT /F1 %d Tf %d TL %d %d Td'
+        % (PDF_FONT_SIZE, PDF_LEADING, PDF_MARGIN, top),
+    ]
+    content.extend(pdf_string(line) + b" '" for line in lines)
+    content.append(b'ET')
+    return b'\n'.join(content)
+
+
+class PDFStream:
+    """Пишет объекты pdf по мере готовности и помнит их смещения для xref."""
+
+    def __init__(self):
+        self.position = 0
+        self.offsets = {}
+
+    def write(self, data):
+        self.position += len(data)
+        return data
+
+    def header(self):
+        return self.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def add(self, number, body):
+        self.offsets[number] = self.position
+        return self.write(b'%d 0 obj\n%s\nendobj\n' % (number, body))
+
+    def trailer(self, root):
+        xref_position = self.position
+        size = max(self.offsets) + 1
+        xref = [b'xref\n0 %d\n0000000000 65535 f \n' % size]
+        xref.extend(
+            b'%010d 00000 n \n' % self.offsets[number]
+            for number in range(1, size)
+        )
+        xref.append(
+            b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+            % (size, root, xref_position),
+        )
+        return self.write(b''.join(xref))
+
+
+def render_pdf(ingredients):
+    """Страницы пишутся по одной, в памяти держится только текущая.
+
+    Объект 2 (дерево страниц) ссылается на все страницы, поэтому
+    записывается последним, когда их номера уже известны.
+    """
+    pdf = PDFStream()
+    yield pdf.header()
+    yield pdf.add(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+    yield pdf.add(3, pdf_font())
+    kids = []
+    number = 4
+    lines = chain([TITLE], map(ingredient_line, ingredients))
+    for page in batches(lines, PDF_LINES_PER_PAGE):
+        content = pdf_page_content(page)
+        yield pdf.add(
+            number,
+            b'<< /Length %d >>\nstream\n%s\nendstream'
+            % (len(content), content),
+        )
+        yield pdf.add(
+            number + 1,
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>'
+            % (PDF_PAGE_WIDTH, PDF_PAGE_HEIGHT, number),
+        )
+        kids.append(b'%d 0 R' % (number + 1))
+        number += 2
+    yield pdf.add(
+        2,
+        b'<< /Type /Pages /Kids [%s] /Count %d >>'
+        % (b' '.join(kids), len(kids)),
+    )
+    yield pdf.trailer(root=1)
+
+
+FORMATS = {
+    'txt': ('text/plain; charset=utf-8', render_txt),
+    'csv': ('text/csv; charset=utf-8', render_csv),
+    'pdf': ('application/pdf', render_pdf),
+}
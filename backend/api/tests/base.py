@@ -0,0 +1,149 @@
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from api.management.commands.benchmark import png_data_uri
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+
+class FoodgramTestCase(APITestCase):
+    """Пользователи, теги, ингредиенты и рецепты для тестов API.
+
+    Загруженные изображения пишутся во временный MEDIA_ROOT.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def _pre_setup(self):
+        super()._pre_setup()
+        # Версия справочников и ответы не должны переходить между тестами.
+        cache.clear()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [
+            Tag.objects.create(name=name, slug=slug, color='#E26C2D')
+            for name, slug in (('Завтрак', 'breakfast'), ('Обед', 'lunch'))
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {number}',
+                measurement_unit='г',
+            )
+            for number in range(5)
+        ]
+
+    @staticmethod
+    def create_user(name):
+        return User.objects.create_user(
+            username=name,
+            email=f'{name}@example.com',
+            password='password-123',
+            first_name=name,
+            last_name=name,
+        )
+
+    def create_recipe(self, author, name='рецепт', ingredients=None):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=name,
+            text='текст',
+            cooking_time=10,
+        )
+        recipe.tags.set(self.tags)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in (ingredients or self.ingredients[:3])
+        )
+        return recipe
+
+    def recipe_data(self, ingredients=None, **fields):
+        return {
+            'name': 'рецепт',
+            'text': 'текст',
+            'cooking_time': 10,
+            'image': png_data_uri(),
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 10}
+                for ingredient in (ingredients or self.ingredients[:3])
+            ],
+            **fields,
+        }
+
+
+@contextmanager
+def keeping_connections():
+    """Не закрывает соединение теста по сигналам запроса.
+
+    Как тестовый клиент Django: иначе ASGI-обработчик закрыл бы
+    соединение посреди транзакции TestCase.
+    """
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    try:
+        yield
+    finally:
+        request_started.connect(close_old_connections)
+        request_finished.connect(close_old_connections)
+
+
+async def asgi_request(application, path, query='', headers=()):
+    """GET через ASGI-приложение так, как его выполняет сервер.
+
+    Возвращает код ответа, заголовки и тело.
+    """
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [
+            (name.lower().encode(), value.encode())
+            for name, value in headers
+        ],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+    with keeping_connections():
+        await application(scope, receive, send)
+    start, *body = messages
+    return (
+        start['status'],
+        {
+            name.decode(): value.decode()
+            for name, value in start['headers']
+        },
+        b''.join(message.get('body', b'') for message in body),
+    )
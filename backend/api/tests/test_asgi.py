@@ -0,0 +1,137 @@
+import asyncio
+import re
+import time
+
+from django.core.asgi import get_asgi_application
+from django.http import HttpResponse
+from django.test import SimpleTestCase, override_settings
+from django.urls import path
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api.async_views import offload
+from api.tests.base import FoodgramTestCase, asgi_request
+from core.middleware import instrument
+from recipes.models import ShoppingCart
+
+SLOW_SECONDS = 0.2
+CONCURRENT_REQUESTS = 8
+
+
+async def slow_view(request):
+    await asyncio.sleep(SLOW_SECONDS)
+    return HttpResponse('ok')
+
+
+class SlowRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        time.sleep(SLOW_SECONDS)
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class SlowRenderView(APIView):
+    authentication_classes = ()
+    permission_classes = ()
+    throttle_classes = ()
+    renderer_classes = (SlowRenderer,)
+
+    def get(self, request):
+        return Response({'ok': True})
+
+
+urlpatterns = [
+    path('slow/', slow_view),
+    path('render/', SlowRenderView.as_view()),
+    path('offloaded-render/', offload(SlowRenderView.as_view())),
+]
+
+
+def server_timing(header):
+    return {
+        name: float(duration) / 1000
+        for name, duration in re.findall(r'(\w+);dur=([\d.]+)', header)
+    }
+
+
+class ASGIShoppingListTests(FoodgramTestCase):
+    def setUp(self):
+        self.user = self.create_user('user')
+        self.token = Token.objects.create(user=self.user)
+        ShoppingCart.objects.create(
+            user=self.user,
+            recipe=self.create_recipe(self.user),
+        )
+
+    async def test_download_shopping_cart(self):
+        status, headers, body = await asgi_request(
+            get_asgi_application(),
+            '/api/recipes/download_shopping_cart/',
+            query='format=csv',
+            headers=[('Authorization', f'Token {self.token.key}')],
+        )
+        self.assertEqual(status, 200, body)
+        self.assertTrue(headers['Content-Type'].startswith('text/csv'))
+        lines = body.decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertIn('ингредиент 0', lines[1])
+
+
+@override_settings(ROOT_URLCONF='api.tests.test_asgi')
+class ASGIConcurrencyTests(SimpleTestCase):
+    async def assert_concurrent(self, middleware):
+        with self.settings(MIDDLEWARE=middleware):
+            application = get_asgi_application()
+        started = time.monotonic()
+        responses = await asyncio.gather(
+            *(
+                asgi_request(application, '/slow/')
+                for _ in range(CONCURRENT_REQUESTS)
+            ),
+        )
+        elapsed = time.monotonic() - started
+        self.assertEqual({status for status, _, _ in responses}, {200})
+        # По очереди запросы заняли бы SLOW_SECONDS * CONCURRENT_REQUESTS.
+        self.assertLess(elapsed, SLOW_SECONDS * CONCURRENT_REQUESTS / 2)
+        return responses
+
+    async def test_replica_routing_middleware(self):
+        await self.assert_concurrent(
+            ['core.middleware.ReplicaRoutingMiddleware'],
+        )
+
+    async def test_performance_middleware(self):
+        responses = await self.assert_concurrent(
+            ['core.middleware.PerformanceMiddleware'],
+        )
+        self.assertIn('Server-Timing', responses[0][1])
+
+
+@override_settings(
+    ROOT_URLCONF='api.tests.test_asgi',
+    MIDDLEWARE=['core.middleware.PerformanceMiddleware'],
+)
+class RenderTimingTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        instrument()
+
+    def assert_render_timed(self, header):
+        timings = server_timing(header)
+        self.assertGreaterEqual(timings['render'], SLOW_SECONDS)
+        self.assertLess(timings['view'], SLOW_SECONDS)
+
+    def test_render_under_wsgi(self):
+        response = self.client.get('/render/')
+        self.assertEqual(response.status_code, 200)
+        self.assert_render_timed(response['Server-Timing'])
+
+    async def test_render_in_async_view_pool(self):
+        status, headers, _ = await asgi_request(
+            get_asgi_application(),
+            '/offloaded-render/',
+        )
+        self.assertEqual(status, 200)
+        self.assert_render_timed(headers['Server-Timing'])
@@ -0,0 +1,53 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from api.tests.base import FoodgramTestCase
+from core.authentication import TokenCache, token_cache
+from users.models import User
+
+
+class CachedTokenAuthenticationTests(FoodgramTestCase):
+    def setUp(self):
+        self.user = self.create_user('reader')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def tearDown(self):
+        token_cache.invalidate([self.token.key])
+
+    def test_reads_use_cache(self):
+        self.client.get('/api/users/me/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+
+    def test_logout_revokes_token(self):
+        self.client.get('/api/users/me/')
+        self.client.post('/api/auth/token/logout/')
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_writes_save_fresh_user(self):
+        self.client.get('/api/users/me/')
+        User.objects.filter(pk=self.user.pk).update(first_name='Новое')
+        response = self.client.post(
+            '/api/users/set_password/',
+            {
+                'current_password': 'password-123',
+                'new_password': 'another-password-123',
+            },
+        )
+        self.assertEqual(response.status_code, 204, response.content)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Новое')
+        self.assertTrue(self.user.check_password('another-password-123'))
+
+    def test_shared_invalidation_reaches_other_processes(self):
+        worker, other_worker = (
+            TokenCache(size=10, ttl=60, shared=True) for _ in range(2)
+        )
+        worker.set(self.token.key, self.token)
+        self.assertIsNotNone(other_worker.get(self.token.key))
+        worker.invalidate([self.token.key])
+        self.assertIsNone(other_worker.get(self.token.key))
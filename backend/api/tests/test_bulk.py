@@ -0,0 +1,93 @@
+from unittest import mock
+
+from api import views
+from api.tests.base import FoodgramTestCase
+from recipes.cart import rebuild_cart_totals
+from recipes.models import Favorite, ShoppingCart
+
+
+class BulkRelationTests(FoodgramTestCase):
+    def setUp(self):
+        self.user = self.create_user('reader')
+        author = self.create_user('author')
+        self.recipes = [self.create_recipe(author) for _ in range(3)]
+        self.ids = [recipe.id for recipe in self.recipes]
+        self.client.force_authenticate(self.user)
+
+    def statuses(self, response):
+        self.assertEqual(response.status_code, 200, response.content)
+        return [item['status'] for item in response.json()]
+
+    def counts(self, field):
+        for recipe in self.recipes:
+            recipe.refresh_from_db()
+        return [getattr(recipe, field) for recipe in self.recipes]
+
+    def assertCartTotalsConsistent(self):
+        totals = self.user.cart_ingredients.order_by('ingredient')
+        current = list(totals.values_list('ingredient', 'total_amount'))
+        rebuild_cart_totals([self.user])
+        self.assertEqual(
+            current,
+            list(totals.values_list('ingredient', 'total_amount')),
+        )
+
+    def test_concurrent_insert_is_not_counted_twice(self):
+        add_relations = views.add_relations
+
+        def insert_meanwhile(model, user, recipes):
+            # Параллельный запрос добавил ту же строку после чтения
+            # существующих, но до вставки.
+            model.objects.create(user=user, recipe=self.recipes[0])
+            return add_relations(model, user, recipes)
+
+        for model, url, field in (
+            (Favorite, '/api/recipes/favorite/', 'favorites_count'),
+            (
+                ShoppingCart,
+                '/api/recipes/shopping_cart/',
+                'shopping_cart_count',
+            ),
+        ):
+            with mock.patch.object(views, 'add_relations', insert_meanwhile):
+                response = self.client.post(
+                    url,
+                    {'recipes': self.ids[:2]},
+                    format='json',
+                )
+            self.assertEqual(self.statuses(response), ['exists', 'added'])
+            self.assertEqual(self.counts(field), [1, 1, 0])
+        self.assertCartTotalsConsistent()
+
+    def test_all_existing_and_all_unknown(self):
+        for url in ('/api/recipes/favorite/', '/api/recipes/shopping_cart/'):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.statuses(
+                        self.client.post(
+                            url,
+                            {'recipes': self.ids},
+                            format='json',
+                        ),
+                    ),
+                    ['added'] * 3,
+                )
+                for method, ids, expected in (
+                    ('post', self.ids, 'exists'),
+                    ('post', [998, 999], 'not_found'),
+                    ('delete', [998, 999], 'not_found'),
+                    ('delete', self.ids, 'removed'),
+                    ('delete', self.ids, 'absent'),
+                ):
+                    response = getattr(self.client, method)(
+                        url,
+                        {'recipes': ids},
+                        format='json',
+                    )
+                    self.assertEqual(
+                        self.statuses(response),
+                        [expected] * len(ids),
+                    )
+        self.assertEqual(self.counts('favorites_count'), [0, 0, 0])
+        self.assertEqual(self.counts('shopping_cart_count'), [0, 0, 0])
+        self.assertFalse(self.user.cart_ingredients.exists())
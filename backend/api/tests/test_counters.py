@@ -0,0 +1,71 @@
+from unittest import mock
+
+from api.serializers import RecipePostSerializer
+from api.tests.base import FoodgramTestCase
+from core.utils import change_counter
+from recipes.models import Favorite, Recipe
+from users.models import Follow, User
+
+
+class CounterTests(FoodgramTestCase):
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.reader = self.create_user('reader')
+        self.recipe = self.create_recipe(self.author)
+
+    def test_counters_follow_relations(self):
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        Follow.objects.create(user=self.reader, following=self.author)
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertEqual(self.author.recipes_count, 1)
+
+    def test_concurrent_increment_survives_recipe_patch(self):
+        validate = RecipePostSerializer.validate
+
+        def favorite_meanwhile(serializer, attrs):
+            # Рецепт уже прочитан представлением, счётчик меняет
+            # параллельный запрос.
+            Favorite.objects.create(user=self.reader, recipe=self.recipe)
+            return validate(serializer, attrs)
+
+        self.client.force_authenticate(self.author)
+        with mock.patch.object(
+            RecipePostSerializer,
+            'validate',
+            favorite_meanwhile,
+        ):
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.id}/',
+                self.recipe_data(name='новое название'),
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'новое название')
+        self.assertEqual(self.recipe.favorites_count, 1)
+
+    def test_user_save_keeps_concurrent_increment(self):
+        user = User.objects.get(pk=self.author.pk)
+        change_counter(User, self.author.pk, 'followers_count', 1)
+        user.set_password('another-password-123')
+        user.save()
+        user.refresh_from_db()
+        self.assertEqual(user.followers_count, 1)
+        self.assertTrue(user.check_password('another-password-123'))
+
+    def test_new_objects_are_saved_with_counters(self):
+        recipe = Recipe(
+            author=self.author,
+            name='ещё рецепт',
+            text='текст',
+            cooking_time=5,
+        )
+        recipe.save()
+        recipe.name = 'переименованный'
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, 'переименованный')
+        self.assertEqual(recipe.favorites_count, 0)
@@ -0,0 +1,35 @@
+from api.tests.base import FoodgramTestCase
+
+
+class RecipeTagFilterTests(FoodgramTestCase):
+    def setUp(self):
+        author = self.create_user('author')
+        breakfast, lunch = self.tags
+        self.both = self.create_recipe(author, 'оба тега')
+        self.breakfast = self.create_recipe(author, 'завтрак')
+        self.breakfast.tags.set([breakfast])
+        self.lunch = self.create_recipe(author, 'обед')
+        self.lunch.tags.set([lunch])
+        self.create_recipe(author, 'без тегов').tags.clear()
+
+    def filtered_ids(self, **params):
+        response = self.client.get(
+            '/api/recipes/',
+            {'tags': ['breakfast', 'lunch'], 'limit': 10, **params},
+        )
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_any_tag_by_default(self):
+        # Рецепт с обоими тегами попадает в выдачу один раз.
+        self.assertCountEqual(
+            self.filtered_ids(),
+            [self.both.id, self.breakfast.id, self.lunch.id],
+        )
+
+    def test_all_tags(self):
+        self.assertEqual(self.filtered_ids(tags_mode='all'), [self.both.id])
+
+    def test_unknown_mode(self):
+        response = self.client.get('/api/recipes/', {'tags_mode': 'none'})
+        self.assertEqual(response.status_code, 400)
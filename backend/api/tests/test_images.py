@@ -0,0 +1,60 @@
+import base64
+import io
+import os
+
+from django.test import override_settings
+from PIL import Image
+
+from api.tests.base import FoodgramTestCase
+
+
+def image_data_uri(size=(8, 8), image_format='PNG', noise=False):
+    if noise:
+        image = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+    else:
+        image = Image.new('RGB', size, 'white')
+    buffer = io.BytesIO()
+    image.save(buffer, image_format)
+    # encodebytes переносит строки через 76 символов, как в MIME.
+    encoded = base64.encodebytes(buffer.getvalue()).decode()
+    return f'data:image/{image_format.lower()};base64,{encoded}'
+
+
+class Base64ImageTests(FoodgramTestCase):
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.client.force_authenticate(self.author)
+
+    def post_image(self, image):
+        return self.client.post(
+            '/api/recipes/',
+            self.recipe_data(image=image),
+            format='json',
+        )
+
+    def test_wrapped_base64_is_accepted(self):
+        # Больше одного куска декодирования, строки переносятся.
+        image = image_data_uri((200, 200), noise=True)
+        self.assertGreater(len(image), 64 * 1024)
+        self.assertIn('\n', image)
+        response = self.post_image(image)
+        self.assertEqual(response.status_code, 201, response.content)
+        with self.author.recipes.get().image.open() as file:
+            self.assertEqual(Image.open(file).size, (200, 200))
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=1024)
+    def test_too_large_image_is_rejected(self):
+        response = self.post_image(image_data_uri((64, 64), noise=True))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1024 байт', response.json()['image'][0])
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=100)
+    def test_too_many_pixels_is_rejected(self):
+        response = self.post_image(image_data_uri((20, 20)))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('100 пикселей', response.json()['image'][0])
+
+    def test_unsupported_format_is_rejected(self):
+        response = self.post_image(image_data_uri(image_format='BMP'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Допустимые форматы', response.json()['image'][0])
@@ -0,0 +1,36 @@
+from django.utils import timezone
+
+from api.tests.base import FoodgramTestCase
+from recipes.models import Recipe
+
+
+class RecipeCursorPaginationTests(FoodgramTestCase):
+    def setUp(self):
+        author = self.create_user('author')
+        self.recipe_ids = [
+            self.create_recipe(author, f'рецепт {number}').id
+            for number in range(7)
+        ]
+        # Одинаковые даты: порядок внутри них задаёт id.
+        Recipe.objects.update(pub_date=timezone.now())
+
+    def test_pages_cover_all_recipes(self):
+        url = '/api/recipes/?pagination=cursor&limit=3'
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertNotIn('count', data)
+            pages.append([recipe['id'] for recipe in data['results']])
+            url = data['next']
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(
+            sum(pages, []),
+            sorted(self.recipe_ids, reverse=True),
+        )
+
+    def test_page_number_pagination_by_default(self):
+        response = self.client.get('/api/recipes/', {'limit': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 7)
@@ -0,0 +1,75 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.management.commands.check_query_plans import PAGINATION_COUNT
+from api.tests.base import FoodgramTestCase
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+
+class QueryCountTests(FoodgramTestCase):
+    """Число запросов горячих эндпоинтов не зависит от объёма страницы."""
+
+    def setUp(self):
+        self.user = self.create_user('reader')
+        self.client.force_authenticate(self.user)
+
+    def add_authors(self, count):
+        for number in range(count):
+            author = self.create_user(f'author{self.authors + number}')
+            Follow.objects.create(user=self.user, following=author)
+            for _ in range(2):
+                recipe = self.create_recipe(author)
+                Favorite.objects.create(user=self.user, recipe=recipe)
+                ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        self.authors += count
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(queries)
+
+    def assertConstantQueries(self, url, expected):
+        self.authors = 0
+        self.add_authors(1)
+        self.assertEqual(self.count_queries(url), expected)
+        self.add_authors(3)
+        self.assertEqual(self.count_queries(url), expected)
+
+    def test_recipe_list(self):
+        self.assertConstantQueries('/api/recipes/?limit=6', 5)
+
+    def test_recipe_list_filtered(self):
+        self.assertConstantQueries(
+            '/api/recipes/?limit=6&tags=breakfast'
+            '&is_favorited=1&is_in_shopping_cart=1',
+            6,
+        )
+
+    def test_recipe_detail(self):
+        self.authors = 0
+        self.add_authors(1)
+        recipe = self.user.favorite.first().recipe
+        self.assertEqual(self.count_queries(f'/api/recipes/{recipe.id}/'), 4)
+
+    def test_subscriptions(self):
+        self.assertConstantQueries(
+            '/api/users/subscriptions/?limit=6&recipes_limit=1',
+            3,
+        )
+
+    def test_user_list(self):
+        self.assertConstantQueries('/api/users/?limit=6', 2)
+
+    def test_page_count_skips_list_annotations(self):
+        # check_query_plans пропускает именно этот запрос.
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/recipes/?limit=6')
+        counts = [
+            query['sql']
+            for query in queries.captured_queries
+            if query['sql'].startswith('SELECT COUNT')
+        ]
+        self.assertEqual(len(counts), 1)
+        self.assertRegex(counts[0], PAGINATION_COUNT)
@@ -0,0 +1,34 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.base import FoodgramTestCase
+from recipes.models import Tag
+
+
+class ReferenceCacheTests(FoodgramTestCase):
+    def get(self, url, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, **headers)
+        return response, len(queries)
+
+    def test_etag_answers_not_modified_without_queries(self):
+        response, _ = self.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        response, queries = self.get('/api/tags/', etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(queries, 0)
+        response, queries = self.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 0)
+
+    def test_change_invalidates_etag_and_cached_response(self):
+        response, _ = self.get('/api/tags/')
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Ужин', slug='dinner', color='#49B64E')
+        response, _ = self.get('/api/tags/', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('dinner', [tag['slug'] for tag in response.json()])
@@ -0,0 +1,79 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.base import FoodgramTestCase
+from recipes.models import Recipe
+from recipes.search import ingredient_index, recipe_index
+from users.search import username_index
+
+
+class UserSearchTests(FoodgramTestCase):
+    def setUp(self):
+        username_index.invalidate()
+        for name in ('ivanovich_petrov', 'petrova', 'sidorov'):
+            self.create_user(name)
+
+    def search(self, query):
+        response = self.client.get('/api/users/', {'search': query})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [user['username'] for user in response.json()['results']]
+
+    def test_substring_matches_are_kept(self):
+        self.assertEqual(self.search('ivan'), ['ivanovich_petrov'])
+        self.assertEqual(
+            self.search('petrov'),
+            ['petrova', 'ivanovich_petrov'],
+        )
+
+    def test_typos_follow_substring_matches(self):
+        self.assertEqual(self.search('sidorof'), ['sidorov'])
+        self.assertEqual(self.search('petrova')[0], 'petrova')
+
+    def test_email_search(self):
+        self.assertEqual(self.search('sidorov@'), ['sidorov'])
+
+
+class IngredientSearchTests(FoodgramTestCase):
+    def setUp(self):
+        ingredient_index.invalidate()
+
+    def search(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/ingredients/', {'name': query})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [item['name'] for item in response.json()], len(queries)
+
+    def test_lookups_are_served_from_memory(self):
+        self.search('ингр')
+        for query in ('ингредиент 1', 'ингридиент 2', 'нгред'):
+            names, queries = self.search(query)
+            self.assertTrue(names, query)
+            # Версия справочников для ключа ответа тоже из кеша.
+            self.assertEqual(queries, 0, query)
+
+
+class RecipeSearchTests(FoodgramTestCase):
+    def setUp(self):
+        author = self.create_user('author')
+        self.by_name = self.create_recipe(author, 'Борщ украинский')
+        self.by_text = self.create_recipe(author, 'Суп')
+        Recipe.objects.filter(pk=self.by_text.pk).update(
+            text='Варится как борщ, но без свёклы.',
+        )
+        self.create_recipe(author, 'Омлет')
+        recipe_index.invalidate()
+
+    def search(self, query):
+        response = self.client.get('/api/recipes/', {'search': query})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_name_matches_rank_above_text_matches(self):
+        self.assertEqual(
+            self.search('борщи'),
+            [self.by_name.id, self.by_text.id],
+        )
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.search('суп борщ'), [self.by_text.id])
+        self.assertEqual(self.search('борщ омлет'), [])
@@ -0,0 +1,64 @@
+from api.shopping_list import pdf_string
+from api.tests.base import FoodgramTestCase
+from recipes.models import ShoppingCart
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingListFormatTests(FoodgramTestCase):
+    def setUp(self):
+        self.user = self.create_user('user')
+        self.client.force_authenticate(self.user)
+        ShoppingCart.objects.create(
+            user=self.user,
+            recipe=self.create_recipe(self.user),
+        )
+
+    def download(self, file_format):
+        response = self.client.get(URL, {'format': file_format})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Disposition'],
+            f'attachment; filename="shopping_cart.{file_format}"',
+        )
+        return response, b''.join(response.streaming_content)
+
+    def test_txt(self):
+        response, body = self.download('txt')
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertEqual(
+            body.decode().splitlines(),
+            [
+                'Список покупок:',
+                'ингредиент 0 (г) - 10',
+                'ингредиент 1 (г) - 10',
+                'ингредиент 2 (г) - 10',
+            ],
+        )
+
+    def test_csv(self):
+        response, body = self.download('csv')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertEqual(
+            body.decode().splitlines(),
+            [
+                'Ингредиент,Единица измерения,Количество',
+                'ингредиент 0,г,10',
+                'ингредиент 1,г,10',
+                'ингредиент 2,г,10',
+            ],
+        )
+
+    def test_pdf(self):
+        response, body = self.download('pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(body.startswith(b'%PDF-'))
+        self.assertTrue(body.endswith(b'%%EOF\n'))
+        self.assertIn(pdf_string('ингредиент 2 (г) - 10'), body)
+        xref_position = int(body.split(b'startxref\n')[1].split()[0])
+        self.assertTrue(body[xref_position:].startswith(b'xref\n'))
+
+    def test_unknown_format(self):
+        response = self.client.get(URL, {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('format', response.json())
@@ -0,0 +1,63 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from api.tests.base import FoodgramTestCase
+from recipes.models import Recipe, ShoppingCart, ShoppingCartIngredient
+
+
+class SimilarRecipeTests(FoodgramTestCase):
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.recipe = self.create_recipe(self.author)
+        Recipe.objects.update(similar_updated=timezone.now())
+
+    def test_ingredient_patch_marks_similar_stale(self):
+        ShoppingCart.objects.create(user=self.author, recipe=self.recipe)
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.id}/',
+            self.recipe_data(ingredients=self.ingredients[2:]),
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.recipe.refresh_from_db()
+        self.assertIsNone(self.recipe.similar_updated)
+        self.assertEqual(
+            set(
+                ShoppingCartIngredient.objects.filter(
+                    user=self.author,
+                ).values_list('ingredient', flat=True),
+            ),
+            {ingredient.id for ingredient in self.ingredients[2:]},
+        )
+
+    def test_neighbours_share_ingredients(self):
+        close = self.create_recipe(
+            self.author,
+            'похожий',
+            self.ingredients[:2],
+        )
+        self.create_recipe(self.author, 'другой', self.ingredients[3:])
+        call_command('compute_similar_recipes', stdout=StringIO())
+        self.assertEqual(self.similar_ids(self.recipe), [close.id])
+
+    def test_common_ingredient_is_kept_by_default(self):
+        recipes = [
+            self.create_recipe(
+                self.author,
+                f'рецепт {number}',
+                self.ingredients[:1],
+            )
+            for number in range(5)
+        ]
+        call_command('compute_similar_recipes', stdout=StringIO())
+        # Ингредиент есть во всех шести рецептах каталога.
+        self.assertEqual(len(self.similar_ids(self.recipe)), 5)
+        self.assertIn(self.recipe.id, self.similar_ids(recipes[0]))
+
+    def similar_ids(self, recipe):
+        response = self.client.get(f'/api/recipes/{recipe.id}/similar/')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [similar['id'] for similar in response.json()]
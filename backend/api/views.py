@@ -1,26 +1,49 @@
-from django.db.models import Exists, OuterRef, Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import (
+    Exists,
+    OuterRef,
+    Prefetch,
+    prefetch_related_objects,
+)
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as CustomUserView
-from rest_framework import filters, status, viewsets
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import OrderingFilter
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from api import serializers
-from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import LimitPagePagination
+from api import serializers, shopping_list
+from api.filters import (
+    IngredientFilter,
+    RecipeFilter,
+    RecipeSearchFilter,
+    UserSearchFilter,
+)
+from api.mixins import ReferenceCacheMixin
+from api.negotiation import FirstRendererNegotiation
+from api.pagination import (
+    FeedPagination,
+    LimitPagePagination,
+    RecipeCursorPagination,
+)
 from api.permissions import AdminOrReadOnly, AuthorOrReadOnly
+from core.utils import change_counters
+from recipes.cart import change_cart_totals
+from recipes.feed import feed_keys, latest_recipes
 from recipes.models import (
     Favorite,
     Ingredient,
     Recipe,
     RecipeIngredient,
     ShoppingCart,
+    ShoppingCartIngredient,
     Tag,
 )
+from recipes.relations import add_relations, remove_relations
 from users.models import Follow, User
 
 
@@ -29,13 +52,20 @@ class UserViewSet(CustomUserView):
     serializer_class = serializers.CustomUserSerializer
     filter_backends = (
         DjangoFilterBackend,
-        filters.SearchFilter,
+        UserSearchFilter,
     )
     search_fields = ('username', 'email')
     permission_classes = (AllowAny,)
 
     def get_queryset(self):
-        return User.objects.all()
+        return User.objects.annotate(
+            is_subscribed=Exists(
+                Follow.objects.filter(
+                    following=OuterRef('pk'),
+                    user=self.request.user.pk,
+                ),
+            ),
+        )
 
     @action(
         detail=True,
@@ -61,8 +91,15 @@ class UserViewSet(CustomUserView):
     @action(detail=False, permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
         pages = self.paginate_queryset(
-            User.objects.filter(following__user=request.user),
+            self.get_queryset().filter(following__user=request.user),
         )
+        recipes = Recipe.objects.all()
+        limit = request.query_params.get('recipes_limit')
+        if pages and limit and limit.isdigit():
+            recipes = recipes.filter(
+                pk__in=latest_recipes(pages, int(limit)),
+            )
+        prefetch_related_objects(pages, Prefetch('recipes', recipes))
         serializer = serializers.FollowSerializer(
             pages,
             many=True,
@@ -71,7 +108,7 @@ class UserViewSet(CustomUserView):
         return self.get_paginated_response(serializer.data)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ReferenceCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
     pagination_class = None
@@ -86,21 +123,58 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filter_backends = (
         DjangoFilterBackend,
         OrderingFilter,
+        RecipeSearchFilter,
     )
     filterset_class = RecipeFilter
+    ordering = RecipeCursorPagination.ordering
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get('pagination') == 'cursor':
+                self._paginator = RecipeCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     def get_queryset(self):
         user = self.request.user
-        return Recipe.objects.all().annotate(
-            is_favorited=Exists(
-                Favorite.objects.filter(recipe=OuterRef('pk'), user=user.pk),
-            ),
-            is_in_shopping_cart=Exists(
-                ShoppingCart.objects.filter(
-                    recipe=OuterRef('pk'),
-                    user=user.pk,
+        return (
+            Recipe.objects.defer('search_vector')
+            .prefetch_related(
+                Prefetch(
+                    'author',
+                    queryset=User.objects.annotate(
+                        is_subscribed=Exists(
+                            Follow.objects.filter(
+                                following=OuterRef('pk'),
+                                user=user.pk,
+                            ),
+                        ),
+                    ),
                 ),
-            ),
+                'tags',
+                Prefetch(
+                    'recipe_ingredients',
+                    queryset=RecipeIngredient.objects.select_related(
+                        'ingredient',
+                    ),
+                ),
+            )
+            .annotate(
+                is_favorited=Exists(
+                    Favorite.objects.filter(
+                        recipe=OuterRef('pk'),
+                        user=user.pk,
+                    ),
+                ),
+                is_in_shopping_cart=Exists(
+                    ShoppingCart.objects.filter(
+                        recipe=OuterRef('pk'),
+                        user=user.pk,
+                    ),
+                ),
+            )
         )
 
     def get_serializer_class(self):
@@ -112,6 +186,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer.save(author=self.request.user)
 
     @staticmethod
+    @transaction.atomic
     def add_to(serializer_class, request, pk):
         recipe = get_object_or_404(Recipe, id=pk)
         serializer = serializer_class(
@@ -123,6 +198,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @staticmethod
+    @transaction.atomic
     def del_from(model, request, pk):
         get_object_or_404(
             model,
@@ -154,17 +230,88 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.del_from(ShoppingCart, request, pk)
 
     @staticmethod
-    def download_shopping_cart(ingredients):
-        shopping_list = 'Список покупок:'
-        for ingredient in ingredients:
-            shopping_list += (
-                f'\n{ingredient["ingredient__name"]} '
-                f'({ingredient["ingredient__measurement_unit"]}) - '
-                f'{ingredient["total_amount"]}'
+    @transaction.atomic
+    def bulk_change(model, counter, request):
+        """Добавляет или удаляет пачку рецептов, отчитываясь по каждому id.
+
+        Строки меняются SQL-запросами без сигналов, поэтому счётчики
+        рецептов и итоги списка покупок меняются здесь и только для строк,
+        которые изменил именно этот запрос.
+        """
+        serializer = serializers.RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+        found = set(
+            Recipe.objects.filter(pk__in=ids).values_list('pk', flat=True),
+        )
+        relations = model.objects.filter(user=request.user, recipe__in=found)
+        if request.method == 'POST':
+            present = set(relations.values_list('recipe_id', flat=True))
+            changed = add_relations(model, request.user, found - present)
+            if model is ShoppingCart:
+                change_cart_totals(relations.filter(recipe__in=changed), 1)
+            outcomes = ('added', 'exists')
+            delta = 1
+        else:
+            # Блокировка: параллельный запрос не удалит эти строки, пока
+            # из итогов вычитается их вклад.
+            present = set(
+                relations.select_for_update().values_list(
+                    'recipe_id',
+                    flat=True,
+                ),
             )
-        filename = 'shopping_cart.txt'
-        response = HttpResponse(shopping_list, content_type='text/plain')
-        response['Content-Disposition'] = f'attachment; filename = {filename}'
+            if model is ShoppingCart:
+                change_cart_totals(relations.filter(recipe__in=present), -1)
+            changed = remove_relations(model, request.user, present)
+            outcomes = ('removed', 'absent')
+            delta = -1
+        change_counters(Recipe, changed, counter, delta)
+        return Response(
+            [
+                {
+                    'id': pk,
+                    'status': (
+                        outcomes[pk not in changed]
+                        if pk in found
+                        else 'not_found'
+                    ),
+                }
+                for pk in ids
+            ],
+        )
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='favorite',
+    )
+    def bulk_favorites(self, request):
+        return self.bulk_change(Favorite, 'favorites_count', request)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart',
+    )
+    def bulk_shopping_cart(self, request):
+        return self.bulk_change(
+            ShoppingCart,
+            'shopping_cart_count',
+            request,
+        )
+
+    @staticmethod
+    def download_shopping_cart(ingredients, file_format):
+        content_type, render = shopping_list.FORMATS[file_format]
+        filename = f'shopping_cart.{file_format}'
+        response = StreamingHttpResponse(
+            render(ingredients),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
 
     @action(
@@ -172,20 +319,72 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=['get'],
         permission_classes=[IsAuthenticated],
         url_path='download_shopping_cart',
+        content_negotiation_class=FirstRendererNegotiation,
     )
     def make_shopping_list(self, request):
-        ingredients = (
-            RecipeIngredient.objects.filter(
-                recipe__shopping_cart__user=request.user,
-            )
+        file_format = request.query_params.get('format', 'txt')
+        if file_format not in shopping_list.FORMATS:
+            formats = ', '.join(shopping_list.FORMATS)
+            raise ValidationError({'format': f'Доступные форматы: {formats}'})
+        # Строки читаются здесь, а не при выдаче ответа: под ASGI Django
+        # 3.2 перебирает потоковый ответ в цикле событий, где ORM
+        # недоступен. Строк не больше, чем ингредиентов в справочнике.
+        ingredients = list(
+            ShoppingCartIngredient.objects.filter(user=request.user)
             .order_by('ingredient__name')
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .annotate(total_amount=Sum('amount'))
+            .values(
+                'ingredient__name',
+                'ingredient__measurement_unit',
+                'total_amount',
+            ),
+        )
+        return self.download_shopping_cart(ingredients, file_format)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart/ingredients',
+    )
+    def shopping_cart_ingredients(self, request):
+        serializer = serializers.ShoppingCartIngredientSerializer(
+            ShoppingCartIngredient.objects.filter(user=request.user)
+            .select_related('ingredient')
+            .order_by('ingredient__name'),
+            many=True,
+        )
+        return Response(serializer.data)
+
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        paginator = FeedPagination()
+        limit = paginator.get_page_size(request)
+        keys = paginator.paginate_keys(
+            feed_keys(request.user, limit + 1, paginator.decode_key(request)),
+            limit,
+            request,
+        )
+        recipes = self.get_queryset().in_bulk([pk for _, pk in keys])
+        serializer = self.get_serializer(
+            [recipes[pk] for _, pk in keys if pk in recipes],
+            many=True,
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True)
+    def similar(self, request, pk):
+        """Похожие рецепты, заранее посчитанные compute_similar_recipes."""
+        recipe = get_object_or_404(Recipe.objects.only('pk'), pk=pk)
+        serializer = serializers.RecipeInfoSerializer(
+            Recipe.objects.filter(neighbour_of__recipe=recipe).order_by(
+                '-neighbour_of__score',
+            ),
+            many=True,
         )
-        return self.download_shopping_cart(ingredients)
+        return Response(serializer.data)
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(ReferenceCacheMixin, viewsets.ModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
     pagination_class = None
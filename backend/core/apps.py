@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     name = 'core'
     verbose_name = 'под капотом'
+
+    def ready(self):
+        import core.signals  # noqa: F401
+
+        if settings.PERFORMANCE_MONITORING:
+            from core.middleware import instrument
+
+            instrument()
@@ -0,0 +1,101 @@
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import SAFE_METHODS
+
+
+class TokenCache:
+    """Кеш токенов с пользователями на TTL.
+
+    С TOKEN_CACHE_SHARED токены хранятся только в кеше Django, общем для
+    процессов, и сброс сразу виден всем воркерам. Иначе - LRU в памяти
+    процесса: сброс доходит только до своего процесса, копии в остальных
+    живут не дольше TTL. Токены хранятся сериализованными: каждый запрос
+    получает свои копии токена и пользователя.
+    """
+
+    def __init__(self, size, ttl, shared):
+        self.size = size
+        self.ttl = ttl
+        self.shared = shared
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(key):
+        # Сам токен не должен попадать в имена ключей внешнего кеша.
+        return 'auth_token:' + hashlib.sha256(key.encode()).hexdigest()
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                del self._tokens[key]
+                entry = None
+            if entry is not None:
+                self._tokens.move_to_end(key)
+        return None if entry is None else entry[0]
+
+    def _set_local(self, key, data):
+        with self._lock:
+            self._tokens[key] = (data, time.monotonic() + self.ttl)
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.size:
+                self._tokens.popitem(last=False)
+
+    def get(self, key):
+        if self.shared:
+            data = cache.get(self.cache_key(key))
+        else:
+            data = self._get_local(key)
+        return None if data is None else pickle.loads(data)
+
+    def set(self, key, token):
+        data = pickle.dumps(token)
+        if self.shared:
+            cache.set(self.cache_key(key), data, self.ttl)
+        else:
+            self._set_local(key, data)
+
+    def invalidate(self, keys):
+        if self.shared:
+            cache.delete_many([self.cache_key(key) for key in keys])
+            return
+        with self._lock:
+            for key in keys:
+                self._tokens.pop(key, None)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса Token + User на каждое чтение.
+
+    Кеш сбрасывается сигналами при удалении токена (выход через djoser),
+    смене пароля или деактивации пользователя. Запросы с записью всегда
+    проверяют токен по базе: пользователь, которого они сохраняют, не
+    должен быть устаревшей копией из кеша.
+    """
+
+    def authenticate(self, request):
+        self.use_cache = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key) if self.use_cache else None
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, token)
+            return user, token
+        return token.user, token
+
+
+token_cache = TokenCache(
+    size=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.TOKEN_CACHE_TTL,
+    shared=settings.TOKEN_CACHE_SHARED,
+)
@@ -0,0 +1,45 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.models import ReferenceVersion
+
+REFERENCE_VERSION_PK = 1
+REFERENCE_VERSION_KEY = 'reference:version'
+
+
+def get_reference_version():
+    """Текущая версия справочных данных (теги, ингредиенты).
+
+    Версия читается из общего кеша и только при промахе из базы, где
+    хранится её источник. Она равна времени последнего изменения в
+    наносекундах, поэтому подходит и для заголовка Last-Modified.
+    """
+    version = cache.get(REFERENCE_VERSION_KEY)
+    if version is not None:
+        return version
+    version = (
+        ReferenceVersion.objects.filter(pk=REFERENCE_VERSION_PK)
+        .values_list('version', flat=True)
+        .first()
+    )
+    if version is None:
+        return bump_reference_version()
+    # add, а не set: не затирает версию, записанную после нашего чтения.
+    cache.add(REFERENCE_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def bump_reference_version():
+    version = time.time_ns()
+    ReferenceVersion.objects.update_or_create(
+        pk=REFERENCE_VERSION_PK,
+        defaults={'version': version},
+    )
+    # До коммита читатели берут версию из базы, после - новую из кеша.
+    cache.delete(REFERENCE_VERSION_KEY)
+    transaction.on_commit(
+        lambda: cache.set(REFERENCE_VERSION_KEY, version, timeout=None),
+    )
+    return version
@@ -0,0 +1,259 @@
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.response import SimpleTemplateResponse
+from rest_framework import serializers
+
+from core.routers import RoutingState, routing
+
+logger = logging.getLogger('foodgram.performance')
+
+current_metrics = ContextVar('performance_metrics', default=None)
+
+
+class RequestMetrics:
+    """Счётчики одного запроса; служит обёрткой execute_wrapper."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        self.active = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql += time.perf_counter() - started
+
+    @contextmanager
+    def measuring(self, phase):
+        """Прибавляет к счётчику `phase` время блока без SQL.
+
+        Вложенные блоки одной фазы считаются один раз.
+        """
+        if phase in self.active:
+            yield
+            return
+        self.active.add(phase)
+        started, sql = time.perf_counter(), self.sql
+        try:
+            yield
+        finally:
+            self.active.discard(phase)
+            elapsed = time.perf_counter() - started - (self.sql - sql)
+            setattr(self, phase, getattr(self, phase) + elapsed)
+
+
+def execute_with_metrics(execute, sql, params, many, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def track_connection(sender, connection, **kwargs):
+    # Соединения свои у каждого потока, а контекст запроса переходит и
+    # в потоки sync_to_async, поэтому запросы считаются в любом потоке.
+    if execute_with_metrics not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_with_metrics)
+
+
+def timed(function, phase):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return function(*args, **kwargs)
+        with metrics.measuring(phase):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+@functools.lru_cache(maxsize=None)
+def instrument():
+    """Подключает замеры SQL, serializer.data и рендеринга ответов.
+
+    Повторный вызов ничего не меняет.
+    """
+    connection_created.connect(track_connection)
+    for connection in connections.all():
+        track_connection(None, connection)
+    for serializer_class in (
+        serializers.Serializer,
+        serializers.ListSerializer,
+    ):
+        serializer_class.data = property(
+            timed(serializer_class.data.fget, 'serialize'),
+        )
+    SimpleTemplateResponse.render = timed(
+        SimpleTemplateResponse.render,
+        'render',
+    )
+
+
+class ContextMiddleware:
+    """Middleware, которое держит состояние запроса в ContextVar `context`.
+
+    Умеет работать и в синхронной, и в асинхронной цепочке. Синхронное
+    middleware под ASGI Django обернул бы в sync_to_async(
+    thread_sensitive=True), и все запросы воркера шли бы через один поток.
+    Подклассы задают start(request) -> состояние и finish(request,
+    response, состояние) -> ответ.
+    """
+
+    sync_capable = True
+    async_capable = True
+    context = None
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start(request)
+        token = self.context.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.context.reset(token)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        token = self.context.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.context.reset(token)
+        return self.finish(request, response, state)
+
+    def start(self, request):
+        raise NotImplementedError
+
+    def finish(self, request, response, state):
+        return response
+
+
+class PerformanceMiddleware(ContextMiddleware):
+    """Замеряет SQL, представление, сериализацию и рендеринг запроса.
+
+    Результат отдаётся в заголовке Server-Timing; при превышении
+    PERFORMANCE_QUERY_BUDGET или PERFORMANCE_LATENCY_BUDGET_MS
+    пишется предупреждение в лог `foodgram.performance`. Фазы считаются
+    в том потоке, где выполняются, в том числе в пуле под ASGI.
+    """
+
+    context = current_metrics
+
+    def start(self, request):
+        metrics = request.performance_metrics = RequestMetrics()
+        return metrics
+
+    def finish(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        timings = (
+            ('db', metrics.sql, f'{metrics.queries} queries'),
+            (
+                'view',
+                max(
+                    total - metrics.sql - metrics.serialize - metrics.render,
+                    0,
+                ),
+                'view without SQL, serializers and render',
+            ),
+            ('serializer', metrics.serialize, 'serializers without SQL'),
+            ('render', metrics.render, 'render without SQL'),
+            ('total', total, 'total'),
+        )
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration * 1000:.1f};desc="{description}"'
+            for name, duration, description in timings
+        )
+        self.check_budget(request, response, metrics, total)
+        return response
+
+    @staticmethod
+    def check_budget(request, response, metrics, total):
+        latency = total * 1000
+        if (
+            metrics.queries <= settings.PERFORMANCE_QUERY_BUDGET
+            and latency <= settings.PERFORMANCE_LATENCY_BUDGET_MS
+        ):
+            return
+        logger.warning(
+            'Performance budget exceeded: %s %s %s queries, %.1f ms',
+            request.method,
+            request.path,
+            metrics.queries,
+            latency,
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': metrics.queries,
+                'sql_ms': round(metrics.sql * 1000, 1),
+                'serializer_ms': round(metrics.serialize * 1000, 1),
+                'render_ms': round(metrics.render * 1000, 1),
+                'total_ms': round(latency, 1),
+            },
+        )
+
+
+class ReplicaRoutingMiddleware(ContextMiddleware):
+    """Отправляет чтения GET и HEAD на реплики.
+
+    После записи клиент получает подписанную cookie и REPLICA_PIN_SECONDS
+    читает с primary, чтобы видеть свои изменения, пока реплики догоняют.
+    Метка хранится у клиента, а не в кеше процесса, поэтому работает при
+    любом числе воркеров.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD')
+    PIN_COOKIE = 'replica_pin'
+    PIN_SALT = 'core.middleware.ReplicaRoutingMiddleware'
+    context = routing
+
+    def pinned(self, request):
+        return (
+            request.get_signed_cookie(
+                self.PIN_COOKIE,
+                default=None,
+                salt=self.PIN_SALT,
+                max_age=settings.REPLICA_PIN_SECONDS,
+            )
+            is not None
+        )
+
+    def start(self, request):
+        return RoutingState(
+            use_replicas=request.method in self.SAFE_METHODS
+            and not self.pinned(request),
+        )
+
+    def finish(self, request, response, state):
+        if state.wrote:
+            response.set_signed_cookie(
+                self.PIN_COOKIE,
+                '1',
+                salt=self.PIN_SALT,
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,26 @@
+class CounterFieldsMixin:
+    """Модель с денормализованными счётчиками COUNTER_FIELDS.
+
+    Счётчики меняются только атомарными UPDATE с F(), поэтому save()
+    существующей строки их не пишет: значения, прочитанные в начале
+    запроса, затёрли бы параллельные изменения.
+    """
+
+    COUNTER_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not args
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
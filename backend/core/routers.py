@@ -0,0 +1,54 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+routing = ContextVar('replica_routing', default=None)
+
+# Токены и сессии читаются с primary: иначе сразу после входа
+# клиент может не найти на отстающей реплике свой новый токен.
+PRIMARY_APPS = ('authtoken', 'sessions')
+
+
+class RoutingState:
+    """Куда читать в рамках одного запроса.
+
+    Объект изменяемый: копии контекста (например, в sync_to_async)
+    ссылаются на него же, поэтому запись в любом потоке запроса видна
+    и middleware.
+    """
+
+    def __init__(self, use_replicas):
+        self.use_replicas = use_replicas
+        self.wrote = False
+
+
+class ReplicaRouter:
+    """Чтения безопасных запросов - с реплик, всё остальное - с primary.
+
+    Вне запроса (команды, shell) состояние не задано, и все запросы
+    идут в default.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = routing.get()
+        if (
+            state is None
+            or not state.use_replicas
+            or state.wrote
+            or model._meta.app_label in PRIMARY_APPS
+        ):
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = routing.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,95 @@
+import heapq
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.db import connections
+from django.db.models import Case, FloatField, Value, When
+
+WORD = re.compile(r'\w+')
+
+
+class ProcessIndex:
+    """Структура в памяти процесса, построенная по таблице.
+
+    Строится при первом обращении и сбрасывается сигналами модели;
+    TTL ограничивает устаревание в других процессах.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._data = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._data = None
+
+    def _build(self):
+        raise NotImplementedError
+
+    def _get(self):
+        data = self._data
+        if data is None or time.monotonic() - data[1] > self.ttl:
+            with self._lock:
+                data = self._data
+                if data is None or time.monotonic() - data[1] > self.ttl:
+                    data = self._data = (self._build(), time.monotonic())
+        return data[0]
+
+
+def trigrams(text):
+    """Триграммы слов строки, как их считает pg_trgm."""
+    grams = set()
+    for word in WORD.findall(text.lower()):
+        padded = f'  {word} '
+        grams.update(
+            padded[start:start + 3] for start in range(len(padded) - 2)
+        )
+    return grams
+
+
+class TrigramIndex:
+    """Триграмма -> номера строк; похожесть считается как similarity()."""
+
+    def __init__(self, texts):
+        self.sizes = []
+        self.postings = defaultdict(list)
+        for number, text in enumerate(texts):
+            grams = trigrams(text)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings[gram].append(number)
+
+    def search(self, query, threshold, limit):
+        """Пары (номер, похожесть) не ниже порога, похожие первыми."""
+        grams = trigrams(query)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        similar = []
+        for number, common in shared.items():
+            similarity = common / (len(grams) + self.sizes[number] - common)
+            if similarity >= threshold:
+                similar.append((number, similarity))
+        return heapq.nlargest(limit, similar, key=lambda item: item[1])
+
+
+def uses_postgres(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def rank_expression(ranks):
+    """Выражение: ранг строки из пар (pk, ранг), для остальных 0."""
+    return Case(
+        *(When(pk=pk, then=Value(rank)) for pk, rank in ranks),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def ranked(queryset, ranks, name):
+    """Оставляет строки из пар (pk, ранг) и добавляет ранг полем `name`."""
+    return queryset.filter(pk__in=[pk for pk, _ in ranks]).annotate(
+        **{name: rank_expression(ranks)},
+    )
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def set_trigram_threshold(sender, connection, **kwargs):
+    # Оператор % в trigram_search сравнивает с этим порогом и при этом
+    # может использовать GIN-индекс, в отличие от similarity() >= порог.
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SET pg_trgm.similarity_threshold = %s',
+            [settings.TRIGRAM_SIMILARITY_THRESHOLD],
+        )
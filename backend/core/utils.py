@@ -1,14 +1,147 @@
 import base64
+import binascii
+from itertools import islice
+from tempfile import SpooledTemporaryFile
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db.models import F
+from PIL import Image
 from rest_framework import serializers
 
+from users.models import Follow
+
+BASE64_CHUNK_SIZE = 64 * 1024
+
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+
+
+def image_format_from_header(header):
+    for signature, image_format in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'invalid_base64': 'Некорректное изображение в base64.',
+        'too_large': 'Размер изображения больше {max_bytes} байт.',
+        'too_many_pixels': 'Изображение больше {max_pixels} пикселей.',
+        'unsupported_format': 'Допустимые форматы изображения: {formats}.',
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            image_format, imgstr = data.split(';base64,')
-            ext = image_format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            # Изображение уже проверено в decode(), а проверка Django
+            # скопировала бы файл в память целиком.
+            return serializers.FileField.to_internal_value(
+                self,
+                self.decode(data),
+            )
 
         return super().to_internal_value(data)
+
+    def decode_chunks(self, data):
+        for offset in range(0, len(data), BASE64_CHUNK_SIZE):
+            try:
+                yield base64.b64decode(
+                    data[offset:offset + BASE64_CHUNK_SIZE],
+                    validate=True,
+                )
+            except (binascii.Error, ValueError):
+                self.fail('invalid_base64')
+
+    def decode(self, data):
+        """Декодирует data URI по частям во временный файл.
+
+        Размер проверяется до декодирования, формат - по первым байтам,
+        число пикселей - по заголовку, до распаковки изображения.
+        """
+        marker = ';base64,'
+        start = data.find(marker)
+        if start == -1:
+            self.fail('invalid_base64')
+        # Переносы строк (base64 в стиле MIME) убираются до нарезки, иначе
+        # куски не выровнены по четыре символа.
+        data = ''.join(data[start + len(marker):].split())
+        padding = 2 if data.endswith('==') else int(data.endswith('='))
+        max_bytes = settings.IMAGE_UPLOAD_MAX_BYTES
+        if len(data) * 3 // 4 - padding > max_bytes:
+            self.fail('too_large', max_bytes=max_bytes)
+
+        chunks = self.decode_chunks(data)
+        header = next(chunks, b'')
+        image_format = image_format_from_header(header)
+        formats = settings.IMAGE_UPLOAD_FORMATS
+        if image_format not in formats:
+            self.fail('unsupported_format', formats=', '.join(formats))
+        file = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+        )
+        file.write(header)
+        for chunk in chunks:
+            file.write(chunk)
+        size = file.tell()
+
+        max_pixels = settings.IMAGE_UPLOAD_MAX_PIXELS
+        file.seek(0)
+        try:
+            with Image.open(file) as image:
+                width, height = image.size
+                if width * height > max_pixels:
+                    self.fail('too_many_pixels', max_pixels=max_pixels)
+                image.verify()
+        except Image.DecompressionBombError:
+            self.fail('too_many_pixels', max_pixels=max_pixels)
+        except (OSError, ValueError, SyntaxError):
+            self.fail('invalid_image')
+        file.seek(0)
+        return UploadedFile(
+            file,
+            name=f'temp.{image_format}',
+            content_type=f'image/{image_format}',
+            size=size,
+        )
+
+
+def batches(rows, size):
+    """Списки по `size` элементов из итерируемого `rows`."""
+    rows = iter(rows)
+    batch = list(islice(rows, size))
+    while batch:
+        yield batch
+        batch = list(islice(rows, size))
+
+
+def get_following_ids(request):
+    """Множество id авторов, на которых подписан пользователь запроса.
+
+    Загружается одним запросом и кешируется на объекте запроса, поэтому
+    все сериализаторы, выводящие пользователей, делят один результат.
+    """
+    if not hasattr(request, '_following_ids'):
+        request._following_ids = frozenset(
+            Follow.objects.filter(user=request.user).values_list(
+                'following_id',
+                flat=True,
+            ),
+        )
+    return request._following_ids
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно меняет денормализованный счётчик на delta."""
+    change_counters(model, [pk], field, delta)
+
+
+def change_counters(model, pks, field, delta):
+    """То же для нескольких объектов одним запросом."""
+    model.objects.filter(pk__in=pks).update(**{field: F(field) + delta})
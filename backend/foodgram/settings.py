@@ -26,6 +26,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'djoser',
     'recipes',
     'users',
@@ -44,8 +45,23 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+PERFORMANCE_MONITORING = os.getenv('PERFORMANCE_MONITORING') == 'True'
+
+PERFORMANCE_QUERY_BUDGET = int(os.getenv('PERFORMANCE_QUERY_BUDGET', default=20))
+
+PERFORMANCE_LATENCY_BUDGET_MS = int(
+    os.getenv('PERFORMANCE_LATENCY_BUDGET_MS', default=300),
+)
+
+if PERFORMANCE_MONITORING:
+    MIDDLEWARE.insert(0, 'core.middleware.PerformanceMiddleware')
+
 ROOT_URLCONF = 'foodgram.urls'
 
+SERVER_MODE = os.getenv('SERVER_MODE', default='wsgi')
+
+ASYNC_VIEW_THREADS = int(os.getenv('ASYNC_VIEW_THREADS', default=16))
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -79,6 +95,48 @@ DATABASES = {
     },
 }
 
+# Реплики только для чтения: DB_REPLICA_HOSTS для PostgreSQL или
+# DB_REPLICA_NAMES (например, пути к файлам SQLite), через запятую.
+DB_REPLICA_HOSTS = [
+    host for host in os.getenv('DB_REPLICA_HOSTS', default='').split(',')
+    if host
+]
+DB_REPLICA_NAMES = [
+    name for name in os.getenv('DB_REPLICA_NAMES', default='').split(',')
+    if name
+]
+
+DATABASE_REPLICAS = []
+for number in range(max(len(DB_REPLICA_HOSTS), len(DB_REPLICA_NAMES))):
+    alias = f'replica_{number + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    if number < len(DB_REPLICA_HOSTS):
+        DATABASES[alias]['HOST'] = DB_REPLICA_HOSTS[number]
+    if number < len(DB_REPLICA_NAMES):
+        DATABASES[alias]['NAME'] = DB_REPLICA_NAMES[number]
+    DATABASE_REPLICAS.append(alias)
+
+# После записи клиент столько секунд читает с primary. Метка - подписанная
+# cookie, поэтому клиент должен хранить cookie (браузеры это делают).
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', default=5))
+
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+    MIDDLEWARE.insert(0, 'core.middleware.ReplicaRoutingMiddleware')
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -116,16 +174,63 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DATA_ROOT = os.path.join(BASE_DIR, 'data')
 
+IMAGE_UPLOAD_MAX_BYTES = int(
+    os.getenv('IMAGE_UPLOAD_MAX_BYTES', default=10 * 1024 * 1024),
+)
+
+IMAGE_UPLOAD_MAX_PIXELS = int(
+    os.getenv('IMAGE_UPLOAD_MAX_PIXELS', default=25_000_000),
+)
+
+IMAGE_UPLOAD_FORMATS = ('jpeg', 'png', 'gif', 'webp')
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', default=300))
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', default=50))
+
+BULK_RECIPES_LIMIT = int(os.getenv('BULK_RECIPES_LIMIT', default=100))
+
+RECIPE_INDEX_TTL = int(os.getenv('RECIPE_INDEX_TTL', default=300))
+
+RECIPE_SEARCH_LIMIT = int(os.getenv('RECIPE_SEARCH_LIMIT', default=500))
+
+USERNAME_INDEX_TTL = int(os.getenv('USERNAME_INDEX_TTL', default=60))
+
+TRIGRAM_SIMILARITY_THRESHOLD = float(
+    os.getenv('TRIGRAM_SIMILARITY_THRESHOLD', default=0.3),
+)
+
+TRIGRAM_SEARCH_LIMIT = int(os.getenv('TRIGRAM_SEARCH_LIMIT', default=20))
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', default=10000))
+
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', default=60))
+
+# Токены хранятся только в кеше CACHE_BACKEND, если он общий для
+# воркеров (любой, кроме LocMemCache): тогда выход и смена пароля видны
+# всем процессам сразу. LRU в памяти процесса годится для одного воркера.
+TOKEN_CACHE_SHARED = os.getenv(
+    'TOKEN_CACHE_SHARED',
+    default=str(
+        CACHES['default']['BACKEND']
+        != 'django.core.cache.backends.locmem.LocMemCache',
+    ),
+) == 'True'
+
+FEED_FANOUT_THRESHOLD = int(os.getenv('FEED_FANOUT_THRESHOLD', default=1000))
+
+FEED_BACKFILL = int(os.getenv('FEED_BACKFILL', default=50))
+
 
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'core.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 6,
@@ -141,7 +246,8 @@ DJOSER = {
     'HIDE_USERS': False,
     'SERIALIZERS': {
         'user_create': 'api.serializers.UserCreateSerializer',
-        'user': 'api.serializers.UserSerializer',
+        'user': 'api.serializers.CustomUserSerializer',
+        'current_user': 'api.serializers.CustomUserSerializer',
     },
     'PERMISSIONS': {
         'user': ('rest_framework.permissions.IsAuthenticated',),
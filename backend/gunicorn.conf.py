@@ -0,0 +1,26 @@
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', default='0:8000')
+workers = int(
+    os.getenv('GUNICORN_WORKERS', default=multiprocessing.cpu_count() * 2 + 1),
+)
+
+if os.getenv('SERVER_MODE', default='wsgi') == 'asgi':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+
+
+def on_starting(server):
+    # Локальный кеш токенов у каждого воркера свой: выход и смена пароля
+    # дошли бы до остальных воркеров только через TOKEN_CACHE_TTL.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    from django.conf import settings
+
+    if server.cfg.workers > 1 and not settings.TOKEN_CACHE_SHARED:
+        raise RuntimeError(
+            'Несколько воркеров требуют общего CACHE_BACKEND для токенов '
+            '(TOKEN_CACHE_SHARED=True) или GUNICORN_WORKERS=1',
+        )
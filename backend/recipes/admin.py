@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from recipes.cart import changing_recipe_ingredients
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -40,6 +41,20 @@ class RecipeIngredientAdmin(admin.ModelAdmin):
     )
     empty_value_display = '-пусто-'
 
+    def save_model(self, request, obj, form, change):
+        with changing_recipe_ingredients([obj.recipe_id]):
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with changing_recipe_ingredients([obj.recipe_id]):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with changing_recipe_ingredients(
+            list(queryset.values_list('recipe_id', flat=True).distinct()),
+        ):
+            super().delete_queryset(request, queryset)
+
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
@@ -82,8 +97,16 @@ class RecipeAdmin(admin.ModelAdmin):
     inlines = (RecipeIngredientInLine,)
     empty_value_display = '-пусто-'
 
+    def save_related(self, request, form, formsets, change):
+        if not change:
+            super().save_related(request, form, formsets, change)
+            return
+        with changing_recipe_ingredients([form.instance.pk]):
+            super().save_related(request, form, formsets, change)
+
+    @admin.display(description='в избранном', ordering='favorites_count')
     def is_favorited(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
 
 @admin.register(Ingredient)
@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.dispatch import Signal
+
+from recipes.models import Recipe, ShoppingCart, ShoppingCartIngredient
+
+# Отправляется в конце changing_recipe_ingredients с recipes - списком id.
+recipe_ingredients_changed = Signal()
+
+
+def change_cart_totals(carts, sign):
+    """Прибавляет (sign=1) или вычитает (sign=-1) ингредиенты рецептов
+    из строк `carts` к итогам списков покупок их владельцев.
+
+    Один INSERT ... ON CONFLICT DO UPDATE на весь набор строк, поэтому
+    параллельные изменения одного списка не теряются. Вычитать нужно
+    до удаления строк списка или ингредиентов рецепта. Пустой набор
+    (например, recipe__in=[]) ничего не меняет.
+    """
+    amounts = (
+        carts.filter(recipe__recipe_ingredients__ingredient__isnull=False)
+        .order_by()
+        .values('user', ingredient=F('recipe__recipe_ingredients__ingredient'))
+        .annotate(total=Sum('recipe__recipe_ingredients__amount'))
+    )
+    try:
+        sql, params = amounts.query.sql_with_params()
+    except EmptyResultSet:
+        return
+    table = connection.ops.quote_name(ShoppingCartIngredient._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, ingredient_id, total_amount) '
+            'SELECT amounts.user_id, amounts.ingredient, amounts.total * %s '
+            f'FROM ({sql}) AS amounts WHERE true '
+            'ON CONFLICT (user_id, ingredient_id) DO UPDATE '
+            f'SET total_amount = {table}.total_amount '
+            '+ EXCLUDED.total_amount',
+            (sign, *params),
+        )
+    if sign < 0:
+        ShoppingCartIngredient.objects.filter(
+            user__in=carts.values('user'),
+            total_amount__lte=0,
+        ).delete()
+
+
+@contextmanager
+def changing_recipe_ingredients(recipes):
+    """Блок, в котором меняются ингредиенты рецептов `recipes`.
+
+    Вклад этих рецептов в списки покупок вычитается до блока и
+    прибавляется после него в той же транзакции, затем отправляется
+    recipe_ingredients_changed. `recipes` - готовый список рецептов или
+    их id, а не ленивый запрос.
+    """
+    recipes = [getattr(recipe, 'pk', recipe) for recipe in recipes]
+    carts = ShoppingCart.objects.filter(recipe__in=recipes)
+    with transaction.atomic():
+        change_cart_totals(carts, -1)
+        yield
+        change_cart_totals(carts, 1)
+        recipe_ingredients_changed.send(sender=Recipe, recipes=recipes)
+
+
+def rebuild_cart_totals(users=None):
+    """Пересчитывает итоги с нуля для всех или указанных пользователей."""
+    totals = ShoppingCartIngredient.objects.all()
+    carts = ShoppingCart.objects.all()
+    if users is not None:
+        totals = totals.filter(user__in=users)
+        carts = carts.filter(user__in=users)
+    totals.delete()
+    change_cart_totals(carts, 1)
@@ -0,0 +1,161 @@
+import heapq
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow, User
+
+
+def latest_recipes(authors, limit):
+    """Id последних `limit` рецептов каждого автора одним запросом."""
+    ranked = (
+        Recipe.objects.filter(author__in=authors)
+        .annotate(
+            recipe_number=Window(
+                expression=RowNumber(),
+                partition_by=F('author'),
+                order_by=F('pub_date').desc(),
+            ),
+        )
+        .order_by()
+        .values('pk', 'recipe_number')
+    )
+    sql, params = ranked.query.sql_with_params()
+    return RawSQL(
+        f'SELECT id FROM ({sql}) AS ranked WHERE recipe_number <= %s',
+        (*params, limit),
+    )
+
+
+def followers_count(author_id):
+    followers = (
+        User.objects.filter(pk=author_id)
+        .values_list('followers_count', flat=True)
+        .first()
+    )
+    return followers or 0
+
+
+def is_celebrity(author_id):
+    """Рецепты автора не раскладываются по лентам, их читает лента."""
+    return followers_count(author_id) > settings.FEED_FANOUT_THRESHOLD
+
+
+def add_to_feeds(follows, recipes):
+    """Кладёт рецепты `recipes` в ленты подписчиков из строк `follows`.
+
+    Один INSERT ... SELECT: подписки соединяются с рецептами по автору,
+    уже лежащие в ленте рецепты пропускаются.
+    """
+    follows_sql, follows_params = (
+        follows.order_by().values('user', 'following').query.sql_with_params()
+    )
+    recipes_sql, recipes_params = (
+        recipes.order_by()
+        .values('pk', 'author', 'pub_date')
+        .query.sql_with_params()
+    )
+    table = connection.ops.quote_name(FeedEntry._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, recipe_id, author_id, pub_date) '
+            'SELECT follows.user_id, recipes.id, recipes.author_id, '
+            'recipes.pub_date '
+            f'FROM ({follows_sql}) AS follows '
+            f'JOIN ({recipes_sql}) AS recipes '
+            'ON recipes.author_id = follows.following_id WHERE true '
+            'ON CONFLICT (user_id, recipe_id) DO NOTHING',
+            (*follows_params, *recipes_params),
+        )
+
+
+def fan_out(recipe):
+    """Раскладывает новый рецепт по лентам подписчиков автора."""
+    if not is_celebrity(recipe.author_id):
+        add_to_feeds(
+            Follow.objects.filter(following=recipe.author_id),
+            Recipe.objects.filter(pk=recipe.pk),
+        )
+
+
+def backfill(follows):
+    """Последние FEED_BACKFILL рецептов авторов - в ленты подписчиков."""
+    add_to_feeds(
+        follows,
+        Recipe.objects.filter(
+            pk__in=latest_recipes(
+                follows.values('following'),
+                settings.FEED_BACKFILL,
+            ),
+        ),
+    )
+
+
+def rebuild_feeds(users=None):
+    """Пересобирает ленты всех или указанных пользователей с нуля."""
+    entries = FeedEntry.objects.all()
+    follows = Follow.objects.filter(
+        following__followers_count__lte=settings.FEED_FANOUT_THRESHOLD,
+    )
+    if users is not None:
+        entries = entries.filter(user__in=users)
+        follows = follows.filter(user__in=users)
+    entries.delete()
+    backfill(follows)
+
+
+def feed_keys(user, limit, before=None):
+    """Ключи (pub_date, id) первых `limit` рецептов ленты после `before`.
+
+    Лента - диапазон индекса (user, pub_date, recipe) своих записей,
+    слитый с последними рецептами знаменитостей, на которых подписан
+    пользователь: их рецепты по лентам не раскладываются.
+    """
+    sources = [
+        (
+            FeedEntry.objects.filter(user=user).order_by(
+                '-pub_date',
+                '-recipe',
+            ),
+            'recipe',
+        ),
+    ]
+    celebrities = list(
+        Follow.objects.filter(
+            user=user,
+            following__followers_count__gt=settings.FEED_FANOUT_THRESHOLD,
+        ).values_list('following', flat=True),
+    )
+    if celebrities:
+        sources.append(
+            (
+                Recipe.objects.filter(author__in=celebrities).order_by(
+                    '-pub_date',
+                    '-id',
+                ),
+                'id',
+            ),
+        )
+    pages = []
+    for queryset, field in sources:
+        if before is not None:
+            pub_date, pk = before
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date)
+                | Q(pub_date=pub_date, **{f'{field}__lt': pk}),
+            )
+        pages.append(list(queryset.values_list('pub_date', field)[:limit]))
+    keys = []
+    seen = set()
+    # Автор мог стать знаменитостью, когда его рецепты уже были в ленте.
+    for key in heapq.merge(*pages, reverse=True):
+        if key[1] not in seen:
+            seen.add(key[1])
+            keys.append(key)
+            if len(keys) == limit:
+                break
+    return keys
@@ -0,0 +1,71 @@
+import time
+
+from django.core.management import BaseCommand
+
+from core.utils import batches
+from recipes.models import Recipe
+from recipes.similar import (
+    IngredientMatrix,
+    affected_recipes,
+    store_neighbours,
+)
+
+TOP = 10
+MAX_DF = 1000
+BLOCK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает для рецептов самые похожие по ингредиентам '
+        '(косинусная близость с весами TF-IDF)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--changed',
+            action='store_true',
+            help='Пересчитать только рецепты, затронутые изменениями',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=TOP,
+            help='Сколько похожих рецептов хранить',
+        )
+        parser.add_argument(
+            '--max-df',
+            type=int,
+            default=MAX_DF,
+            help='Не учитывать ингредиенты, которые есть в большем числе '
+            'рецептов',
+        )
+        parser.add_argument(
+            '--block-size',
+            type=int,
+            default=BLOCK_SIZE,
+            help='Количество рецептов в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        top = options['top']
+        matrix = IngredientMatrix(options['max_df'])
+        if options['changed']:
+            changed = Recipe.objects.filter(
+                similar_updated__isnull=True,
+            ).values_list('pk', flat=True)
+            recipes = sorted(affected_recipes(matrix, list(changed), top))
+        else:
+            recipes = list(
+                Recipe.objects.order_by('pk').values_list('pk', flat=True),
+            )
+        for block in batches(recipes, options['block_size']):
+            store_neighbours(matrix, block, top)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Пересчитано рецептов: {len(recipes)}; '
+                f'время: {elapsed:.1f} с',
+            ),
+        )
@@ -0,0 +1,342 @@
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand, call_command
+from django.db import connection, transaction
+from django.db.models import Max
+from PIL import Image
+
+from core.cache import bump_reference_version
+from core.utils import batches
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Follow, User
+
+BATCH_SIZE = 10000
+START_DATE = datetime(2023, 1, 1, tzinfo=timezone.utc)
+PUBLISHING_PERIOD = timedelta(days=730)
+DEFAULT_TAGS = (
+    ('Завтрак', 'breakfast', '#E26C2D'),
+    ('Обед', 'lunch', '#49B64E'),
+    ('Ужин', 'dinner', '#8775D2'),
+)
+PLACEHOLDER_COLORS = (
+    '#E26C2D',
+    '#49B64E',
+    '#8775D2',
+    '#F4C430',
+    '#4A90D9',
+    '#D94A7A',
+)
+
+
+def insert_rows(model, rows, batch_size):
+    """Вставляет словари значений полей пачками, минуя модели.
+
+    На PostgreSQL строки загружаются через COPY, на остальных СУБД -
+    через executemany; значения готовятся полями модели, как в ORM.
+    """
+    fields = [
+        field
+        for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+    columns = ', '.join(
+        connection.ops.quote_name(field.column) for field in fields
+    )
+    table = connection.ops.quote_name(model._meta.db_table)
+    total = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for batch in batches(rows, batch_size):
+            values = [
+                [
+                    field.get_db_prep_save(
+                        row[field.attname]
+                        if field.attname in row
+                        else field.get_default(),
+                        connection,
+                    )
+                    for field in fields
+                ]
+                for row in batch
+            ]
+            if connection.vendor == 'postgresql':
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(values)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f'COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                    buffer,
+                )
+            else:
+                placeholders = ', '.join(['%s'] * len(fields))
+                cursor.executemany(
+                    f'INSERT INTO {table} ({columns}) '
+                    f'VALUES ({placeholders})',
+                    values,
+                )
+            total += len(batch)
+    return total
+
+
+class SkewedChoice:
+    """Выбор с распределением Ципфа: первые элементы популярнее."""
+
+    def __init__(self, rng, population, exponent):
+        self.rng = rng
+        self.population = population
+        self.cum_weights = list(
+            accumulate(
+                1 / (rank + 1) ** exponent for rank in range(len(population))
+            ),
+        )
+
+    def one(self):
+        return self.rng.choices(
+            self.population,
+            cum_weights=self.cum_weights,
+        )[0]
+
+    def distinct(self, count):
+        count = min(count, len(self.population))
+        chosen = set()
+        while len(chosen) < count:
+            chosen.update(
+                self.rng.choices(
+                    self.population,
+                    cum_weights=self.cum_weights,
+                    k=count - len(chosen),
+                ),
+            )
+        return chosen
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует детерминированный набор данных заданного масштаба '
+        'для нагрузочного тестирования'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--ingredients-per-recipe',
+            type=int,
+            default=10,
+            help='Среднее число ингредиентов в рецепте',
+        )
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=20,
+            help='Среднее число подписок пользователя',
+        )
+        parser.add_argument(
+            '--favorites',
+            type=int,
+            default=30,
+            help='Среднее число избранных рецептов пользователя',
+        )
+        parser.add_argument(
+            '--cart',
+            type=int,
+            default=5,
+            help='Среднее число рецептов в списке покупок',
+        )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Показатель распределения Ципфа для популярности',
+        )
+        parser.add_argument(
+            '--images',
+            type=int,
+            default=0,
+            help='Сколько картинок-заглушек создать для рецептов',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='load')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    @staticmethod
+    def new_ids(model, previous_max):
+        return list(
+            model.objects.filter(pk__gt=previous_max or 0)
+            .order_by('pk')
+            .values_list('pk', flat=True),
+        )
+
+    @staticmethod
+    def max_id(model):
+        return model.objects.aggregate(last=Max('pk'))['last']
+
+    @staticmethod
+    def placeholder_images(count):
+        names = []
+        for number in range(count):
+            buffer = io.BytesIO()
+            color = PLACEHOLDER_COLORS[number % len(PLACEHOLDER_COLORS)]
+            Image.new('RGB', (64, 64), color).save(buffer, 'PNG')
+            names.append(
+                default_storage.save(
+                    f'app/media/images/placeholder_{number}.png',
+                    ContentFile(buffer.getvalue()),
+                ),
+            )
+        return names
+
+    @staticmethod
+    def count_around(rng, mean):
+        return rng.randint(0, 2 * mean) if mean else 0
+
+    def create_users(self, options):
+        password = make_password(options['prefix'], salt=options['prefix'])
+        previous_max = self.max_id(User)
+        prefix = options['prefix']
+        insert_rows(
+            User,
+            (
+                {
+                    'username': f'{prefix}{number}',
+                    'email': f'{prefix}{number}@example.com',
+                    'first_name': f'Имя{number}',
+                    'last_name': f'Фамилия{number}',
+                    'password': password,
+                    'is_active': True,
+                    'date_joined': START_DATE,
+                }
+                for number in range(options['users'])
+            ),
+            options['batch_size'],
+        )
+        return self.new_ids(User, previous_max)
+
+    def create_recipes(self, rng, options, authors, images):
+        previous_max = self.max_id(Recipe)
+        period = int(PUBLISHING_PERIOD.total_seconds())
+        insert_rows(
+            Recipe,
+            (
+                {
+                    'author_id': authors.one(),
+                    'name': f'Рецепт {number}',
+                    'text': f'Описание рецепта {number}',
+                    'cooking_time': rng.randint(5, 180),
+                    'pub_date': START_DATE
+                    + timedelta(seconds=rng.randrange(period)),
+                    'image': rng.choice(images) if images else None,
+                }
+                for number in range(options['recipes'])
+            ),
+            options['batch_size'],
+        )
+        return self.new_ids(Recipe, previous_max)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        if not Ingredient.objects.exists():
+            call_command('import_csv', stdout=io.StringIO())
+        ingredient_ids = list(
+            Ingredient.objects.order_by('name', 'measurement_unit')
+            .values_list('pk', flat=True),
+        )
+        rng.shuffle(ingredient_ids)
+        tag_ids = [
+            Tag.objects.get_or_create(
+                slug=slug,
+                defaults={'name': name, 'color': color},
+            )[0].pk
+            for name, slug, color in DEFAULT_TAGS
+        ]
+        images = self.placeholder_images(options['images'])
+
+        user_ids = self.create_users(options)
+        authors = SkewedChoice(rng, user_ids, options['skew'])
+        recipe_ids = self.create_recipes(rng, options, authors, images)
+        popular_recipes = SkewedChoice(rng, recipe_ids, options['skew'])
+        ingredients = SkewedChoice(rng, ingredient_ids, options['skew'])
+        mean_ingredients = options['ingredients_per_recipe']
+
+        counts = {
+            'users': len(user_ids),
+            'recipes': len(recipe_ids),
+            'recipe_ingredients': insert_rows(
+                RecipeIngredient,
+                (
+                    {
+                        'recipe_id': recipe_id,
+                        'ingredient_id': ingredient_id,
+                        'amount': rng.randint(1, 500),
+                    }
+                    for recipe_id in recipe_ids
+                    for ingredient_id in ingredients.distinct(
+                        rng.randint(1, max(2 * mean_ingredients - 1, 1)),
+                    )
+                ),
+                batch_size,
+            ),
+            'recipe_tags': insert_rows(
+                Recipe.tags.through,
+                (
+                    {'recipe_id': recipe_id, 'tag_id': tag_id}
+                    for recipe_id in recipe_ids
+                    for tag_id in rng.sample(tag_ids, rng.randint(1, 2))
+                ),
+                batch_size,
+            ),
+            'follows': insert_rows(
+                Follow,
+                (
+                    {'user_id': user_id, 'following_id': author_id}
+                    for user_id in user_ids
+                    for author_id in authors.distinct(
+                        self.count_around(rng, options['follows']),
+                    )
+                    if author_id != user_id
+                ),
+                batch_size,
+            ),
+        }
+        for name, model, mean in (
+            ('favorites', Favorite, options['favorites']),
+            ('shopping_cart', ShoppingCart, options['cart']),
+        ):
+            counts[name] = insert_rows(
+                model,
+                (
+                    {'user_id': user_id, 'recipe_id': recipe_id}
+                    for user_id in user_ids
+                    for recipe_id in popular_recipes.distinct(
+                        self.count_around(rng, mean),
+                    )
+                ),
+                batch_size,
+            )
+        call_command('reconcile_counters', stdout=io.StringIO())
+        call_command('rebuild_cart_totals', stdout=io.StringIO())
+        call_command('rebuild_feeds', stdout=io.StringIO())
+        bump_reference_version()
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                ', '.join(f'{name}: {count}' for name, count in counts.items())
+                + f'; время: {elapsed:.1f} с',
+            ),
+        )
@@ -1,25 +1,115 @@
 import csv
+import io
+import json
 import logging
 import os.path
+import time
 
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
 
+from core.cache import bump_reference_version
+from core.utils import batches
 from recipes.models import Ingredient
 
+BATCH_SIZE = 1000
+
 
 class Command(BaseCommand):
-    help_text = 'Loads data from csv files'
+    help = 'Loads ingredients from csv or json files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(settings.DATA_ROOT, 'ingredients.csv'),
+            help='Путь к файлу ingredients.csv или ingredients.json',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество строк в одной пачке',
+        )
+
+    @staticmethod
+    def read_rows(file_path, extension):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            if extension == '.csv':
+                for name, unit in csv.reader(f):
+                    yield name, unit
+            else:
+                for item in json.load(f):
+                    yield item['name'], item['measurement_unit']
+
+    def copy_rows(self, rows, batch_size):
+        """Загрузка через COPY во временную таблицу (PostgreSQL)."""
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE ingredient_staging '
+                '(name varchar(200), measurement_unit varchar(50)) '
+                'ON COMMIT DROP',
+            )
+            total = 0
+            for batch in batches(rows, batch_size):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY ingredient_staging (name, measurement_unit) '
+                    'FROM STDIN WITH (FORMAT csv)',
+                    buffer,
+                )
+                total += len(batch)
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM ingredient_staging '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING',
+            )
+            return total, cursor.rowcount
+
+    def bulk_create_rows(self, rows, batch_size):
+        before = Ingredient.objects.count()
+        total = 0
+        for batch in batches(rows, batch_size):
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=unit)
+                    for name, unit in batch
+                ],
+                ignore_conflicts=True,
+            )
+            total += len(batch)
+        return total, Ingredient.objects.count() - before
 
     def handle(self, *args, **options):
         logger = logging.getLogger(__name__)
         logger.info('Trying to load ingredients data')
-        file_path = os.path.join(settings.DATA_ROOT, 'ingredients.csv')
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            for name, unit in reader:
-                Ingredient.objects.get_or_create(
-                    name=name,
-                    measurement_unit=unit,
+        file_path = options['path']
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension not in ('.csv', '.json'):
+            raise CommandError(f'Неподдерживаемый формат: {extension}')
+        if not os.path.exists(file_path):
+            raise CommandError(f'Файл не найден: {file_path}')
+        started = time.monotonic()
+        rows = self.read_rows(file_path, extension)
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                total, inserted = self.copy_rows(rows, options['batch_size'])
+            else:
+                total, inserted = self.bulk_create_rows(
+                    rows,
+                    options['batch_size'],
                 )
-            logger.info('Ingredients data successfully uploaded')
+        # COPY и bulk_create не шлют сигналы, сбрасывающие версию.
+        bump_reference_version()
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Добавлено: {inserted}, пропущено: {total - inserted}, '
+                f'время: {elapsed:.2f} с',
+            ),
+        )
+        logger.info('Ingredients data successfully uploaded')
@@ -0,0 +1,48 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from recipes.feed import rebuild_feeds
+from recipes.models import FeedEntry
+from users.models import User
+
+CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок пачками по id пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            help='Пересобрать только ленту пользователя с этим id',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Количество пользователей в одной пачке',
+        )
+
+    def handle(self, *args, **options):
+        if options['user']:
+            with transaction.atomic():
+                rebuild_feeds(options['user'])
+        else:
+            chunk_size = options['chunk_size']
+            last_pk = User.objects.aggregate(last_pk=Max('pk'))['last_pk']
+            for start in range(0, (last_pk or 0) + 1, chunk_size):
+                with transaction.atomic():
+                    rebuild_feeds(
+                        User.objects.filter(
+                            pk__gte=start,
+                            pk__lt=start + chunk_size,
+                        ).values('pk'),
+                    )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Записей в лентах: {FeedEntry.objects.count()}',
+            ),
+        )
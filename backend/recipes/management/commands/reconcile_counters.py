@@ -0,0 +1,61 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User
+
+CHUNK_SIZE = 10000
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'shopping_cart_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'following'),
+)
+
+
+def actual_count(related, field_name):
+    return Coalesce(
+        Subquery(
+            related.objects.filter(**{field_name: OuterRef('pk')})
+            .order_by()
+            .values(field_name)
+            .annotate(total=Count('pk'))
+            .values('total'),
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики пачками по id'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Количество строк в одной пачке',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        for model, counter, related, field_name in COUNTERS:
+            count = actual_count(related, field_name)
+            last_pk = model.objects.aggregate(last_pk=Max('pk'))['last_pk']
+            fixed = 0
+            for start in range(0, (last_pk or 0) + 1, chunk_size):
+                with transaction.atomic():
+                    fixed += (
+                        model.objects.filter(
+                            pk__gte=start,
+                            pk__lt=start + chunk_size,
+                        )
+                        .exclude(**{counter: count})
+                        .update(**{counter: count})
+                    )
+            self.stdout.write(
+                f'{model._meta.model_name}.{counter}: исправлено {fixed}',
+            )
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:04
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorite = apps.get_model('recipes', 'Favorite')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    User = apps.get_model('users', 'User')
+    Follow = apps.get_model('users', 'Follow')
+    counters = (
+        (Recipe, 'favorites_count', Favorite, 'recipe'),
+        (Recipe, 'shopping_cart_count', ShoppingCart, 'recipe'),
+        (User, 'recipes_count', Recipe, 'author'),
+        (User, 'followers_count', Follow, 'following'),
+    )
+    for model, counter, related, field_name in counters:
+        count = Subquery(
+            related.objects.filter(**{field_name: OuterRef('pk')})
+            .order_by()
+            .values(field_name)
+            .annotate(total=Count('pk'))
+            .values('total'),
+        )
+        model.objects.update(**{counter: Coalesce(count, 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_recipe_pub_date_id_idx'),
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='в избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='в списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
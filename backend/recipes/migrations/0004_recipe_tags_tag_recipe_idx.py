@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Индекс (tag_id, recipe_id) для EXISTS-фильтра по тегам.
+
+    Уникальный индекс (recipe_id, tag_id) создаётся Django сам, а
+    обратного порядка у автоматической промежуточной таблицы нет.
+    """
+
+    dependencies = [
+        ('recipes', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX recipe_tags_tag_recipe_idx '
+            'ON recipes_recipe_tags (tag_id, recipe_id);',
+            'DROP INDEX recipe_tags_tag_recipe_idx;',
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:11
+
+from django.db import migrations, models
+
+INGREDIENT_NAME_INDEX = 'ingredient_name_upper_pattern_idx'
+
+
+def create_ingredient_name_index(apps, schema_editor):
+    # Поиск `^name` даёт UPPER("name"::text) LIKE UPPER('...%'); такой
+    # индекс с text_pattern_ops бывает только в PostgreSQL.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX {INGREDIENT_NAME_INDEX} ON recipes_ingredient '
+        '(UPPER("name"::text) text_pattern_ops)',
+    )
+
+
+def drop_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INGREDIENT_NAME_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_tags_tag_recipe_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date'], name='recipe_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipeingredient',
+            index=models.Index(fields=['recipe', 'ingredient', 'amount'], name='recipe_ingredient_amount_idx'),
+        ),
+        migrations.RunPython(
+            create_ingredient_name_index,
+            drop_ingredient_name_index,
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:24
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_INDEX = 'recipe_search_vector_idx'
+
+
+def create_search_trigger(apps, schema_editor):
+    # Вектор ведёт триггер: он срабатывает и на вставки в обход ORM
+    # (COPY в generate_dataset), и на изменения только названия/текста.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE FUNCTION recipes_recipe_search_vector() RETURNS trigger AS $$ '
+        'BEGIN '
+        'NEW.search_vector := '
+        "setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A') || "
+        "setweight(to_tsvector('russian', coalesce(NEW.text, '')), 'B'); "
+        'RETURN NEW; '
+        'END $$ LANGUAGE plpgsql',
+    )
+    schema_editor.execute(
+        'CREATE TRIGGER recipes_recipe_search_vector_update '
+        'BEFORE INSERT OR UPDATE OF name, text, search_vector '
+        'ON recipes_recipe FOR EACH ROW '
+        'EXECUTE PROCEDURE recipes_recipe_search_vector()',
+    )
+    schema_editor.execute('UPDATE recipes_recipe SET search_vector = NULL')
+    schema_editor.execute(
+        f'CREATE INDEX {SEARCH_INDEX} ON recipes_recipe '
+        'USING gin (search_vector)',
+    )
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {SEARCH_INDEX}')
+    schema_editor.execute(
+        'DROP TRIGGER IF EXISTS recipes_recipe_search_vector_update '
+        'ON recipes_recipe',
+    )
+    schema_editor.execute(
+        'DROP FUNCTION IF EXISTS recipes_recipe_search_vector()',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_cart_ingredient_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:31
+
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feeds(apps, schema_editor):
+    Follow = apps.get_model('users', 'Follow')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    follows = (
+        Follow.objects.filter(
+            following__followers_count__lte=settings.FEED_FANOUT_THRESHOLD,
+        )
+        .order_by('following')
+        .values_list('following', 'user')
+    )
+    for author, group in groupby(follows.iterator(), key=itemgetter(0)):
+        recipes = list(
+            Recipe.objects.filter(author=author)
+            .order_by('-pub_date')
+            .values_list('pk', 'pub_date')[: settings.FEED_BACKFILL],
+        )
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(
+                    user_id=user,
+                    recipe_id=recipe,
+                    author_id=author,
+                    pub_date=pub_date,
+                )
+                for _, user in group
+                for recipe, pub_date in recipes
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0008_ingredient_name_trigram_idx'),
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='автор')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipe', verbose_name='рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='подписчик')),
+            ],
+            options={
+                'verbose_name': 'запись ленты',
+                'verbose_name_plural': 'записи лент',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_user_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'author'], name='feed_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_similar_recipes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(verbose_name='версия')),
+            ],
+            options={
+                'verbose_name': 'версия справочников',
+                'verbose_name_plural': 'версии справочников',
+            },
+        ),
+    ]
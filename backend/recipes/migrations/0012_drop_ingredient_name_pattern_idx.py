@@ -0,0 +1,35 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:05
+
+from django.db import migrations
+
+INGREDIENT_NAME_INDEX = 'ingredient_name_upper_pattern_idx'
+
+
+def drop_ingredient_name_index(apps, schema_editor):
+    # Поиск ингредиентов идёт по индексу в памяти, `^name` в базу больше
+    # не попадает.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INGREDIENT_NAME_INDEX}')
+
+
+def create_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX {INGREDIENT_NAME_INDEX} ON recipes_ingredient '
+        '(UPPER("name"::text) text_pattern_ops)',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_reference_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            drop_ingredient_name_index,
+            create_ingredient_name_index,
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:10
+
+from django.db import migrations
+
+TRIGRAM_INDEX = 'ingredient_name_trgm_idx'
+
+
+def drop_trigram_index(apps, schema_editor):
+    # Похожие названия ингредиентов ищет индекс в памяти процесса.
+    # Расширение pg_trgm остаётся: им пользуется поиск пользователей.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX {TRIGRAM_INDEX} ON recipes_ingredient '
+        'USING gin (name gin_trgm_ops)',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_drop_ingredient_name_pattern_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_trigram_index, create_trigram_index),
+    ]
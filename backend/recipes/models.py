@@ -1,6 +1,8 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 
+from core.models import CounterFieldsMixin
 from users.models import User
 
 
@@ -34,6 +36,23 @@ class Tag(models.Model):
         return self.name
 
 
+class ReferenceVersion(models.Model):
+    """Версия справочников (теги, ингредиенты) для ETag и ключей кеша.
+
+    Одна строка в базе - источник версии; запросы читают её копию из
+    общего кеша и обращаются к базе только при промахе.
+    """
+
+    version = models.BigIntegerField(verbose_name='версия')
+
+    class Meta:
+        verbose_name = 'версия справочников'
+        verbose_name_plural = 'версии справочников'
+
+    def __str__(self):
+        return str(self.version)
+
+
 class Ingredient(models.Model):
     name = models.CharField(
         max_length=200,
@@ -60,7 +79,7 @@ class Ingredient(models.Model):
         return f'{self.name} {self.measurement_unit}'
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     author = models.ForeignKey(
         User,
         verbose_name='автор',
@@ -104,11 +123,43 @@ class Recipe(models.Model):
         verbose_name='дата публикации',
         auto_now_add=True,
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='в избранном',
+        default=0,
+        editable=False,
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='в списках покупок',
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name='поисковый вектор',
+        null=True,
+        editable=False,
+    )
+    similar_updated = models.DateTimeField(
+        verbose_name='похожие рецепты пересчитаны',
+        null=True,
+        editable=False,
+    )
+
+    COUNTER_FIELDS = ('favorites_count', 'shopping_cart_count')
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name} {self.text}'
@@ -143,6 +194,12 @@ class RecipeIngredient(models.Model):
                 name='unique_ingredient',
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'ingredient', 'amount'],
+                name='recipe_ingredient_amount_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return f'{self.recipe}, {self.ingredient}'
@@ -202,3 +259,131 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.recipe} {self.user}'
+
+
+class ShoppingCartIngredient(models.Model):
+    """Суммарное количество ингредиента в списке покупок пользователя.
+
+    Поддерживается при изменении списка покупок и состава рецептов,
+    пересобирается командой rebuild_cart_totals.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cart_ingredients',
+        verbose_name='пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='cart_totals',
+        verbose_name='ингредиент',
+    )
+    total_amount = models.IntegerField(verbose_name='всего')
+
+    class Meta:
+        verbose_name = 'ингредиент списка покупок'
+        verbose_name_plural = 'ингредиенты списков покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_cart_ingredient',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user}, {self.ingredient}: {self.total_amount}'
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя.
+
+    Записи добавляются при публикации рецепта (кроме авторов с большим
+    числом подписчиков - их рецепты лента читает напрямую), при подписке
+    и пересобираются командой rebuild_feeds.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='подписчик',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='рецепт',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='автор',
+    )
+    pub_date = models.DateTimeField(verbose_name='дата публикации')
+
+    class Meta:
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'записи лент'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='feed_user_author_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user}, {self.recipe}'
+
+
+class SimilarRecipe(models.Model):
+    """Рецепт из числа самых похожих по ингредиентам.
+
+    Заполняется командой compute_similar_recipes; score - косинусная
+    близость векторов ингредиентов с весами TF-IDF.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='neighbours',
+        verbose_name='рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='neighbour_of',
+        verbose_name='похожий рецепт',
+    )
+    score = models.FloatField(verbose_name='близость')
+
+    class Meta:
+        verbose_name = 'похожий рецепт'
+        verbose_name_plural = 'похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'similar'),
+                name='unique_similar_recipe',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='similar_recipe_score_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} ~ {self.similar}: {self.score:.3f}'
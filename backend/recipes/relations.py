@@ -0,0 +1,37 @@
+from django.db import connection
+
+
+def add_relations(model, user, recipes):
+    """Добавляет строки (user, рецепт) и возвращает id добавленных рецептов.
+
+    INSERT ... ON CONFLICT DO NOTHING RETURNING: строки, которые успел
+    вставить параллельный запрос, в результат не попадают.
+    """
+    if not recipes:
+        return set()
+    table = connection.ops.quote_name(model._meta.db_table)
+    values = ', '.join(['(%s, %s)'] * len(recipes))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, recipe_id) VALUES {values} '
+            'ON CONFLICT (user_id, recipe_id) DO NOTHING '
+            'RETURNING recipe_id',
+            [value for recipe in recipes for value in (user.pk, recipe)],
+        )
+        return {recipe for recipe, in cursor.fetchall()}
+
+
+def remove_relations(model, user, recipes):
+    """Удаляет строки (user, рецепт) и возвращает id удалённых рецептов."""
+    if not recipes:
+        return set()
+    table = connection.ops.quote_name(model._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(recipes))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} '
+            f'WHERE user_id = %s AND recipe_id IN ({placeholders}) '
+            'RETURNING recipe_id',
+            [user.pk, *recipes],
+        )
+        return {recipe for recipe, in cursor.fetchall()}
@@ -0,0 +1,157 @@
+import heapq
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+
+from core.search import (
+    WORD,
+    ProcessIndex,
+    TrigramIndex,
+    ranked,
+    uses_postgres,
+)
+from recipes.models import Ingredient, Recipe
+
+SEARCH_CONFIG = 'russian'
+# Веса A и B, с которыми ts_rank считает название и текст рецепта.
+NAME_WEIGHT = 1.0
+TEXT_WEIGHT = 0.4
+RUSSIAN_ENDINGS = sorted(
+    (
+        'иями ями ами ого его ому ему ыми ими ая яя ое ее ые ие ый ий ой ом '
+        'ем ах ях ов ев ей ам ям ую юю ию ия а я о е ы и у ю ь й'
+    ).split(),
+    key=len,
+    reverse=True,
+)
+MIN_STEM = 3
+# Короче трёх букв опечатки не ищем: триграмм слишком мало.
+MIN_FUZZY_QUERY = 3
+
+
+def stem(word):
+    """Грубый стеммер: отрезает самое длинное русское окончание."""
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[: -len(ending)]
+    return word
+
+
+def words(text):
+    text = text.lower().replace('ё', 'е')
+    return [stem(word) for word in WORD.findall(text)]
+
+
+class IngredientIndex(ProcessIndex):
+    """Отсортированный список ингредиентов.
+
+    Префиксные запросы отвечаются бинарным поиском, запросы с опечатками -
+    по триграммному индексу в памяти, который считает похожесть как
+    pg_trgm. В базу подсказки не ходят ни на одной СУБД.
+    """
+
+    def _build(self):
+        ingredients = sorted(
+            Ingredient.objects.all(),
+            key=lambda item: (item.name.lower(), item.measurement_unit),
+        )
+        keys = [ingredient.name.lower() for ingredient in ingredients]
+        return keys, ingredients, TrigramIndex(keys)
+
+    def similar(self, query, limit):
+        _, ingredients, index = self._get()
+        return [
+            ingredients[number]
+            for number, _ in index.search(
+                query,
+                settings.TRIGRAM_SIMILARITY_THRESHOLD,
+                min(limit, settings.TRIGRAM_SEARCH_LIMIT),
+            )
+        ]
+
+    def search(self, query, limit):
+        """Точные совпадения, по префиксу, по вхождению, затем похожие."""
+        keys, ingredients, _ = self._get()
+        query = query.lower()
+        start = bisect_left(keys, query)
+        end = bisect_left(keys, query[:-1] + chr(ord(query[-1]) + 1), start)
+        results = ingredients[start:min(end, start + limit)]
+        if len(results) < limit:
+            for key, ingredient in zip(keys, ingredients):
+                if query in key and not key.startswith(query):
+                    results.append(ingredient)
+                    if len(results) == limit:
+                        break
+        if len(results) < limit and len(query) >= MIN_FUZZY_QUERY:
+            found = {ingredient.pk for ingredient in results}
+            results.extend(
+                ingredient
+                for ingredient in self.similar(query, limit)
+                if ingredient.pk not in found
+            )
+        return results[:limit]
+
+
+class RecipeIndex(ProcessIndex):
+    """Инвертированный индекс рецептов для СУБД без полнотекстового поиска.
+
+    Основа слова -> {id рецепта: вес}; название весит больше текста,
+    как в поисковом векторе PostgreSQL.
+    """
+
+    def _build(self):
+        postings = defaultdict(dict)
+        recipes = Recipe.objects.values_list('pk', 'name', 'text')
+        for pk, name, text in recipes.iterator():
+            for weight, field in ((NAME_WEIGHT, name), (TEXT_WEIGHT, text)):
+                for word in words(field):
+                    scores = postings[word]
+                    scores[pk] = scores.get(pk, 0) + weight
+        return dict(postings)
+
+    def search(self, query, limit):
+        """Пары (id, ранг) рецептов со всеми словами запроса, лучшие выше."""
+        postings = self._get()
+        terms = set(words(query))
+        if not terms:
+            return []
+        matches = sorted((postings.get(term, {}) for term in terms), key=len)
+        scores = dict(matches[0])
+        for other in matches[1:]:
+            scores = {
+                pk: score + other[pk]
+                for pk, score in scores.items()
+                if pk in other
+            }
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+def search_recipes(queryset, query):
+    """Рецепты, подходящие под запрос, от самых релевантных.
+
+    На PostgreSQL - по полю `search_vector` с GIN-индексом, иначе по
+    индексу в памяти процесса, не больше RECIPE_SEARCH_LIMIT рецептов.
+    """
+    if uses_postgres(queryset):
+        search_query = SearchQuery(
+            query,
+            config=SEARCH_CONFIG,
+            search_type='websearch',
+        )
+        queryset = queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query),
+        )
+    else:
+        queryset = ranked(
+            queryset,
+            recipe_index.search(query, limit=settings.RECIPE_SEARCH_LIMIT),
+            'search_rank',
+        )
+    return queryset.order_by('-search_rank', '-pub_date', '-id')
+
+
+ingredient_index = IngredientIndex(ttl=settings.INGREDIENT_INDEX_TTL)
+recipe_index = RecipeIndex(ttl=settings.RECIPE_INDEX_TTL)
@@ -0,0 +1,91 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core.cache import bump_reference_version
+from core.utils import change_counter
+from recipes.cart import change_cart_totals, recipe_ingredients_changed
+from recipes.feed import fan_out
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.search import ingredient_index, recipe_index
+from recipes.similar import mark_stale
+from users.models import User
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def invalidate_recipe_index(sender, **kwargs):
+    recipe_index.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver([post_save, post_delete], sender=Tag)
+def bump_reference_data_version(sender, **kwargs):
+    bump_reference_version()
+
+
+@receiver(post_save, sender=Favorite)
+def increment_favorites_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def decrement_favorites_count(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def increment_shopping_cart_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'shopping_cart_count', 1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_shopping_cart_count(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, 'shopping_cart_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_cart_totals(sender, instance, created, **kwargs):
+    if created:
+        change_cart_totals(ShoppingCart.objects.filter(pk=instance.pk), 1)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def subtract_from_cart_totals(sender, instance, **kwargs):
+    # До удаления: при каскаде с рецептом его ингредиенты ещё на месте.
+    change_cart_totals(ShoppingCart.objects.filter(pk=instance.pk), -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def add_to_follower_feeds(sender, instance, created, **kwargs):
+    if created:
+        fan_out(instance)
+
+
+@receiver(pre_delete, sender=Recipe)
+def mark_neighbours_stale(sender, instance, **kwargs):
+    # Рецепты, у которых удаляемый среди похожих, теряют одного соседа.
+    Recipe.objects.filter(neighbours__similar=instance).update(
+        similar_updated=None,
+    )
+
+
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def mark_similar_stale(sender, recipes, **kwargs):
+    mark_stale(recipes)
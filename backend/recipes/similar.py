@@ -0,0 +1,135 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from recipes.models import Recipe, RecipeIngredient, SimilarRecipe
+
+
+class IngredientMatrix:
+    """Разреженная матрица рецепт x ингредиент с весами TF-IDF.
+
+    Хранится по строкам (рецепт -> ингредиенты) и как инвертированный
+    индекс `postings` (ингредиент -> рецепты). Строки нормированы, поэтому
+    косинусная близость - сумма произведений весов по общим ингредиентам.
+    Ингредиенты, которые есть больше чем в `max_df` рецептах,
+    отбрасываются: это число, а не доля, поэтому в маленьком каталоге
+    общие ингредиенты остаются (их вес понижает IDF), а в большом длина
+    списков индекса ограничена.
+    """
+
+    def __init__(self, max_df):
+        recipes = defaultdict(set)
+        rows = RecipeIngredient.objects.filter(
+            ingredient__isnull=False,
+        ).values_list('recipe', 'ingredient')
+        for recipe, ingredient in rows.iterator():
+            recipes[recipe].add(ingredient)
+        total = len(recipes)
+        frequency = Counter(
+            ingredient
+            for ingredients in recipes.values()
+            for ingredient in ingredients
+        )
+        idf = {
+            ingredient: math.log((1 + total) / (1 + count)) + 1
+            for ingredient, count in frequency.items()
+            if count <= max_df
+        }
+        self.rows = {}
+        self.postings = defaultdict(list)
+        for recipe, ingredients in recipes.items():
+            weights = [
+                (ingredient, idf[ingredient])
+                for ingredient in ingredients
+                if ingredient in idf
+            ]
+            norm = math.sqrt(sum(weight ** 2 for _, weight in weights))
+            if not norm:
+                continue
+            row = [
+                (ingredient, weight / norm) for ingredient, weight in weights
+            ]
+            self.rows[recipe] = row
+            for ingredient, weight in row:
+                self.postings[ingredient].append((recipe, weight))
+
+    def scores(self, recipe):
+        """Близость рецепта к рецептам с общими ингредиентами.
+
+        Кандидаты берутся только из списков индекса по ингредиентам
+        рецепта, остальные рецепты не перебираются.
+        """
+        scores = {}
+        get = scores.get
+        for ingredient, weight in self.rows.get(recipe, ()):
+            for other, other_weight in self.postings[ingredient]:
+                scores[other] = get(other, 0.0) + weight * other_weight
+        scores.pop(recipe, None)
+        return scores
+
+    def neighbours(self, recipe, top):
+        scores = self.scores(recipe)
+        if len(scores) > top:
+            # Порог по одним значениям быстрее nlargest по парам с key.
+            worst = heapq.nlargest(top, scores.values())[-1]
+            scores = {
+                other: score
+                for other, score in scores.items()
+                if score >= worst
+            }
+        return sorted(scores.items(), key=itemgetter(1), reverse=True)[:top]
+
+
+def mark_stale(recipes):
+    """Помечает соседей рецептов `recipes` для пересчёта с --changed."""
+    Recipe.objects.filter(pk__in=recipes).update(similar_updated=None)
+
+
+def affected_recipes(matrix, changed, top):
+    """Рецепты, чьих соседей нужно пересчитать после изменения `changed`.
+
+    Кроме самих изменённых это рецепты, у которых изменённый уже есть
+    среди соседей, и те, в чей топ он теперь попадает.
+    """
+    affected = set(changed)
+    affected.update(
+        SimilarRecipe.objects.filter(
+            similar__similar_updated__isnull=True,
+        ).values_list('recipe', flat=True),
+    )
+    worst = {
+        recipe: (count, score)
+        for recipe, count, score in SimilarRecipe.objects.values('recipe')
+        .annotate(count=Count('pk'), score=Min('score'))
+        .values_list('recipe', 'count', 'score')
+    }
+    for recipe in changed:
+        for other, score in matrix.scores(recipe).items():
+            if other in affected:
+                continue
+            count, worst_score = worst.get(other, (0, 0))
+            if count < top or score > worst_score:
+                affected.add(other)
+    return affected
+
+
+@transaction.atomic
+def store_neighbours(matrix, recipes, top):
+    """Заменяет соседей рецептов `recipes` на `top` самых похожих."""
+    SimilarRecipe.objects.filter(recipe__in=recipes).delete()
+    SimilarRecipe.objects.bulk_create(
+        (
+            SimilarRecipe(recipe_id=recipe, similar_id=similar, score=score)
+            for recipe in recipes
+            for similar, score in matrix.neighbours(recipe, top)
+        ),
+        batch_size=1000,
+    )
+    Recipe.objects.filter(pk__in=recipes).update(
+        similar_updated=timezone.now(),
+    )
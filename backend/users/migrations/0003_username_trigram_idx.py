@@ -0,0 +1,34 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:40
+
+from django.db import migrations
+
+TRIGRAM_INDEX = 'user_username_trgm_idx'
+
+
+def create_trigram_index(apps, schema_editor):
+    # GIN с gin_trgm_ops есть только в PostgreSQL; на остальных СУБД
+    # похожие имена ищет индекс в памяти процесса.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # Расширение общее для нескольких индексов и при откате остаётся.
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX {TRIGRAM_INDEX} ON users_user '
+        'USING gin (username gin_trgm_ops)',
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
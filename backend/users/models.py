@@ -1,8 +1,10 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from core.models import CounterFieldsMixin
 
-class User(AbstractUser):
+
+class User(CounterFieldsMixin, AbstractUser):
     email = models.EmailField(
         'email',
         max_length=254,
@@ -31,7 +33,18 @@ class User(AbstractUser):
         blank=False,
         help_text='Введите пароль',
     )
+    recipes_count = models.PositiveIntegerField(
+        'количество рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        'количество подписчиков',
+        default=0,
+        editable=False,
+    )
 
+    COUNTER_FIELDS = ('recipes_count', 'followers_count')
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
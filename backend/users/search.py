@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import BooleanField, ExpressionWrapper, Q
+
+from core.search import (
+    ProcessIndex,
+    TrigramIndex,
+    rank_expression,
+    uses_postgres,
+)
+from users.models import User
+
+
+class UsernameIndex(ProcessIndex):
+    """Триграммы имён пользователей для СУБД без pg_trgm."""
+
+    def _build(self):
+        users = list(User.objects.values_list('pk', 'username'))
+        return (
+            [pk for pk, _ in users],
+            TrigramIndex(username for _, username in users),
+        )
+
+    def search(self, query, threshold, limit):
+        """Пары (id, похожесть), похожие первыми."""
+        ids, index = self._get()
+        return [
+            (ids[number], similarity)
+            for number, similarity in index.search(query, threshold, limit)
+        ]
+
+
+def search_users(queryset, query):
+    """Пользователи, чьи username или e-mail содержат запрос, и с похожим
+    username (опечатки).
+
+    Сначала идут вхождения, затем только похожие; внутри групп - по
+    похожести username на запрос. В PostgreSQL похожие отбирает оператор %
+    по GIN-индексу, иначе - триграммный индекс в памяти.
+    """
+    contains = Q(username__icontains=query) | Q(email__icontains=query)
+    if uses_postgres(queryset):
+        similar = Q(username__trigram_similar=query)
+        similarity = TrigramSimilarity('username', query)
+    else:
+        ranks = username_index.search(
+            query,
+            settings.TRIGRAM_SIMILARITY_THRESHOLD,
+            settings.TRIGRAM_SEARCH_LIMIT,
+        )
+        similar = Q(pk__in=[pk for pk, _ in ranks])
+        similarity = rank_expression(ranks)
+    return (
+        queryset.filter(contains | similar)
+        .annotate(
+            contains_query=ExpressionWrapper(
+                contains,
+                output_field=BooleanField(),
+            ),
+            similarity=similarity,
+        )
+        .order_by('-contains_query', '-similarity', 'username')
+    )
+
+
+username_index = UsernameIndex(ttl=settings.USERNAME_INDEX_TTL)
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.authentication import token_cache
+from core.utils import change_counter
+from recipes.feed import backfill, followers_count, is_celebrity
+from recipes.models import FeedEntry
+from users.models import Follow, User
+from users.search import username_index
+
+
+@receiver(post_save, sender=Follow)
+def increment_followers_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.following_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_followers_count(sender, instance, **kwargs):
+    change_counter(User, instance.following_id, 'followers_count', -1)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_username_index(sender, update_fields=None, **kwargs):
+    # Вход обновляет только last_login - индекс от этого не меняется.
+    if update_fields is None or 'username' in update_fields:
+        username_index.invalidate()
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate([instance.key])
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, update_fields=None, **kwargs):
+    # Пароль и активность проверяются при входе по токену, поэтому
+    # любое сохранение пользователя, кроме last_login, сбрасывает кеш.
+    if update_fields is None or not set(update_fields) <= {'last_login'}:
+        tokens = Token.objects.filter(user=instance)
+        token_cache.invalidate(list(tokens.values_list('key', flat=True)))
+
+
+# Счётчик подписчиков к этому моменту уже обновлён приёмниками выше.
+@receiver(post_save, sender=Follow)
+def backfill_follower_feed(sender, instance, created, **kwargs):
+    if created and not is_celebrity(instance.following_id):
+        backfill(Follow.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Follow)
+def prune_follower_feed(sender, instance, **kwargs):
+    FeedEntry.objects.filter(
+        user=instance.user_id,
+        author=instance.following_id,
+    ).delete()
+    if followers_count(instance.following_id) == (
+        settings.FEED_FANOUT_THRESHOLD
+    ):
+        # Автор перестал быть знаменитостью: лента больше не читает его
+        # рецепты напрямую, они нужны в лентах оставшихся подписчиков.
+        backfill(Follow.objects.filter(following=instance.following_id))